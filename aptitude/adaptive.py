@@ -0,0 +1,198 @@
+"""
+Adaptive practice: Elo ratings for users (per subtopic) and questions, used to pick
+the question a user should answer correctly TARGET_SUCCESS of the time.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalog import get_catalog_version
+from .models import Question, QuestionRating, UserAnswer, UserSubtopicRating
+
+SCALE = 400
+INITIAL_USER_RATING = 1500.0
+INITIAL_QUESTION_RATINGS = {'easy': 1300.0, 'medium': 1500.0, 'hard': 1700.0}
+USER_K = 32
+QUESTION_K = 16
+# Ratings move twice as fast until they have seen this many answers
+PROVISIONAL_ANSWERS = 10
+TARGET_SUCCESS = 0.7
+TABLE_TIMEOUT = 60
+USER_RATING_TIMEOUT = 60 * 60
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def expected_score(user_rating, question_rating):
+    """Chance that a user with user_rating answers a question with question_rating correctly."""
+    return 1 / (1 + 10 ** ((question_rating - user_rating) / SCALE))
+
+
+def k_factor(base, answer_count):
+    return base * 2 if answer_count < PROVISIONAL_ANSWERS else base
+
+
+def apply_answer(user_rating, question_rating, is_correct):
+    """Move both ratings towards the outcome of one answer."""
+    surprise = (1.0 if is_correct else 0.0) - expected_score(user_rating.rating, question_rating.rating)
+    user_rating.rating += k_factor(USER_K, user_rating.answer_count) * surprise
+    question_rating.rating -= k_factor(QUESTION_K, question_rating.answer_count) * surprise
+    user_rating.answer_count += 1
+    question_rating.answer_count += 1
+
+
+def user_rating_key(user_id, subtopic_id):
+    return f'adaptive:user:{user_id}:{subtopic_id}'
+
+
+def update_ratings(pending):
+    """Fold a batch of PendingAnswers into the user and question ratings."""
+    question_difficulties = {answer.question_id: answer.difficulty for answer in pending}
+    pairs = {(answer.user_id, answer.subtopic_id) for answer in pending}
+
+    question_ratings = {
+        rating.question_id: rating
+        for rating in QuestionRating.objects.select_for_update().filter(question_id__in=question_difficulties)
+    }
+    user_ratings = {
+        (rating.user_id, rating.subtopic_id): rating
+        for rating in UserSubtopicRating.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            subtopic_id__in={subtopic_id for _, subtopic_id in pairs},
+        )
+        if (rating.user_id, rating.subtopic_id) in pairs
+    }
+    created_questions = [
+        QuestionRating(question_id=question_id, rating=INITIAL_QUESTION_RATINGS[difficulty])
+        for question_id, difficulty in question_difficulties.items()
+        if question_id not in question_ratings
+    ]
+    created_users = [
+        UserSubtopicRating(user_id=user_id, subtopic_id=subtopic_id, rating=INITIAL_USER_RATING)
+        for user_id, subtopic_id in pairs
+        if (user_id, subtopic_id) not in user_ratings
+    ]
+    changed_questions = list(question_ratings.values())
+    changed_users = list(user_ratings.values())
+    question_ratings.update((rating.question_id, rating) for rating in created_questions)
+    user_ratings.update(((rating.user_id, rating.subtopic_id), rating) for rating in created_users)
+
+    for answer in sorted(pending, key=lambda answer: answer.answered_at):
+        apply_answer(
+            user_ratings[(answer.user_id, answer.subtopic_id)],
+            question_ratings[answer.question_id],
+            answer.is_correct,
+        )
+
+    QuestionRating.objects.bulk_create(created_questions)
+    UserSubtopicRating.objects.bulk_create(created_users)
+    if changed_questions:
+        QuestionRating.objects.bulk_update(changed_questions, ['rating', 'answer_count'])
+    if changed_users:
+        UserSubtopicRating.objects.bulk_update(changed_users, ['rating', 'answer_count'])
+
+    fresh = {
+        user_rating_key(user_id, subtopic_id): rating.rating
+        for (user_id, subtopic_id), rating in user_ratings.items()
+    }
+    transaction.on_commit(lambda: cache.set_many(fresh, USER_RATING_TIMEOUT))
+
+
+def rebuild_ratings(chunk_size=2000):
+    """Replay the full UserAnswer history into fresh ratings. Returns (users, questions) row counts."""
+    answers = (
+        UserAnswer.objects
+        .order_by('answered_at', 'id')
+        .values_list('user_id', 'question_id', 'question__subtopic_id', 'question__difficulty', 'is_correct')
+    )
+    user_ratings, question_ratings = {}, {}
+    for user_id, question_id, subtopic_id, difficulty, is_correct in answers.iterator(chunk_size=chunk_size):
+        user_rating = user_ratings.get((user_id, subtopic_id))
+        if user_rating is None:
+            user_rating = user_ratings[(user_id, subtopic_id)] = UserSubtopicRating(
+                user_id=user_id, subtopic_id=subtopic_id, rating=INITIAL_USER_RATING,
+            )
+        question_rating = question_ratings.get(question_id)
+        if question_rating is None:
+            question_rating = question_ratings[question_id] = QuestionRating(
+                question_id=question_id, rating=INITIAL_QUESTION_RATINGS[difficulty],
+            )
+        apply_answer(user_rating, question_rating, is_correct)
+
+    with transaction.atomic():
+        UserSubtopicRating.objects.all().delete()
+        QuestionRating.objects.all().delete()
+        UserSubtopicRating.objects.bulk_create(user_ratings.values(), batch_size=chunk_size)
+        QuestionRating.objects.bulk_create(question_ratings.values(), batch_size=chunk_size)
+    cache.delete_many([user_rating_key(*pair) for pair in user_ratings])
+    with _tables_lock:
+        _tables.clear()
+    return len(user_ratings), len(question_ratings)
+
+
+def get_user_rating(user_id, subtopic_id):
+    key = user_rating_key(user_id, subtopic_id)
+    rating = cache.get(key)
+    if rating is None:
+        rating = (
+            UserSubtopicRating.objects.filter(user_id=user_id, subtopic_id=subtopic_id)
+            .values_list('rating', flat=True).first()
+        ) or INITIAL_USER_RATING
+        cache.set(key, rating, USER_RATING_TIMEOUT)
+    return rating
+
+
+def _load_table(subtopic_id):
+    rows = sorted(
+        (INITIAL_QUESTION_RATINGS[difficulty] if rating is None else rating, question_id)
+        for question_id, difficulty, rating in
+        Question.objects.filter(subtopic_id=subtopic_id).values_list('id', 'difficulty', 'elo_rating__rating')
+    )
+    return [rating for rating, _ in rows], [question_id for _, question_id in rows]
+
+
+def get_question_table(subtopic_id):
+    """
+    Return (ratings, question_ids) for a subtopic, both ordered by rating.
+    Held per process until TABLE_TIMEOUT passes or the catalog version changes.
+    """
+    version = get_catalog_version()
+    now = time.monotonic()
+    with _tables_lock:
+        entry = _tables.get(subtopic_id)
+    if entry is not None and entry[0] == version and entry[1] > now:
+        return entry[2]
+    table = _load_table(subtopic_id)
+    with _tables_lock:
+        _tables[subtopic_id] = (version, now + TABLE_TIMEOUT, table)
+    return table
+
+
+def target_rating(user_rating):
+    """The question rating this user is expected to answer correctly TARGET_SUCCESS of the time."""
+    return user_rating + SCALE * math.log10(1 / TARGET_SUCCESS - 1)
+
+
+def pick_question(ratings, question_ids, target, exclude=()):
+    """The id of the question rated closest to target that is not in exclude, or None."""
+    above = bisect_left(ratings, target)
+    below = above - 1
+    while below >= 0 or above < len(ratings):
+        if above >= len(ratings) or (below >= 0 and target - ratings[below] <= ratings[above] - target):
+            candidate, below = question_ids[below], below - 1
+        else:
+            candidate, above = question_ids[above], above + 1
+        if candidate not in exclude:
+            return candidate
+    return None
+
+
+def next_question_id(user_id, subtopic_id, exclude=()):
+    """Choose the next question for a user in a subtopic, skipping the ids in exclude."""
+    ratings, question_ids = get_question_table(subtopic_id)
+    return pick_question(ratings, question_ids, target_rating(get_user_rating(user_id, subtopic_id)), exclude)
@@ -0,0 +1,212 @@
+"""
+Daily answer rollups for the analytics page, refreshed incrementally by the
+refresh_analytics command.
+"""
+import datetime
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyAnswerRollup, RollupCheckpoint, UserAnswer
+
+CHECKPOINT_NAME = 'daily_answers'
+# New answers folded in per refresh transaction
+REFRESH_CHUNK_SIZE = 2000
+# Users rebuilt per transaction by rebuild_rollups()
+REBUILD_CHUNK_USERS = 100
+DELETE_BATCH_USERS = 200
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=tz)
+    return start, start + datetime.timedelta(days=1)
+
+
+def _build_rollups(answers, user_days=None):
+    """
+    Aggregate a UserAnswer queryset into unsaved DailyAnswerRollup rows, one
+    per (user, day, topic, difficulty). Counts and sums come from one grouped
+    query, the time percentiles from one ordered pass over time_taken.
+    ``user_days`` optionally limits the result to those (user_id, day) pairs.
+    """
+    keyed = answers.annotate(
+        day=TruncDate('answered_at'),
+        topic=F('question__subtopic__topic_id'),
+        level=F('question__difficulty'),
+    )
+    group = ('user_id', 'day', 'topic', 'level')
+
+    times = defaultdict(list)
+    for *key, time_taken in keyed.order_by(*group, 'time_taken').values_list(*group, 'time_taken').iterator():
+        times[tuple(key)].append(time_taken)
+
+    rollups = []
+    rows = keyed.values(*group).annotate(
+        attempts=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+        total=Sum('time_taken'),
+    ).order_by()
+    for row in rows:
+        if user_days is not None and (row['user_id'], row['day']) not in user_days:
+            continue
+        group_times = times[tuple(row[field] for field in group)]
+        rollups.append(DailyAnswerRollup(
+            user_id=row['user_id'],
+            date=row['day'],
+            topic_id=row['topic'],
+            difficulty=row['level'],
+            attempts=row['attempts'],
+            correct_count=row['correct'],
+            total_time=row['total'],
+            time_p50=percentile(group_times, 50),
+            time_p90=percentile(group_times, 90),
+        ))
+    return rollups
+
+
+def _rebuild_user_days(user_days):
+    """Replace the rollups of the given (user_id, day) pairs with fresh aggregates."""
+    days_by_user = defaultdict(set)
+    for user_id, day in user_days:
+        days_by_user[user_id].add(day)
+    start = _day_bounds(min(day for _, day in user_days))[0]
+    end = _day_bounds(max(day for _, day in user_days))[1]
+
+    rollups = _build_rollups(
+        UserAnswer.objects.filter(user_id__in=days_by_user, answered_at__gte=start, answered_at__lt=end),
+        user_days=set(user_days),
+    )
+
+    # SQLite caps expression depth, so OR together a bounded number of users at a time
+    user_ids = list(days_by_user)
+    for offset in range(0, len(user_ids), DELETE_BATCH_USERS):
+        condition = Q()
+        for user_id in user_ids[offset:offset + DELETE_BATCH_USERS]:
+            condition |= Q(user_id=user_id, date__in=days_by_user[user_id])
+        DailyAnswerRollup.objects.filter(condition).delete()
+    DailyAnswerRollup.objects.bulk_create(rollups)
+
+
+def _next_chunk_end(after_id, high_water, chunk_size):
+    ids = UserAnswer.objects.filter(id__gt=after_id, id__lte=high_water).order_by('id').values_list('id', flat=True)
+    last = ids[chunk_size - 1:chunk_size].first()
+    return last if last is not None else high_water
+
+
+def refresh_rollups(chunk_size=REFRESH_CHUNK_SIZE):
+    """
+    Fold answers newer than the checkpoint into the daily rollups.
+
+    Every (user, day) touched by a new answer is recomputed in full, which keeps
+    percentiles exact and makes the refresh safe to re-run. New answers are
+    taken chunk_size at a time, each chunk in its own transaction that also
+    advances the checkpoint, so the write lock is only ever held briefly.
+    Returns the number of user-days rebuilt.
+    """
+    high_water = UserAnswer.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    rebuilt = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+            if high_water <= checkpoint.last_answer_id:
+                return rebuilt
+
+            chunk_end = _next_chunk_end(checkpoint.last_answer_id, high_water, chunk_size)
+            touched = list(
+                UserAnswer.objects
+                .filter(id__gt=checkpoint.last_answer_id, id__lte=chunk_end)
+                .annotate(day=TruncDate('answered_at'))
+                .values_list('user_id', 'day')
+                .distinct()
+            )
+            _rebuild_user_days(touched)
+
+            checkpoint.last_answer_id = chunk_end
+            checkpoint.save()
+        rebuilt += len(touched)
+
+
+def rebuild_rollups(users_per_chunk=REBUILD_CHUNK_USERS):
+    """
+    Drop every rollup and rebuild them from the full answer history, one
+    transaction per chunk of users. Returns the number of user-days rebuilt.
+    """
+    with transaction.atomic():
+        DailyAnswerRollup.objects.all().delete()
+        checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        checkpoint.last_answer_id = 0
+        checkpoint.save()
+
+    high_water = UserAnswer.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    user_ids = list(
+        UserAnswer.objects.filter(id__lte=high_water).order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+    rebuilt = 0
+    for offset in range(0, len(user_ids), users_per_chunk):
+        chunk = user_ids[offset:offset + users_per_chunk]
+        with transaction.atomic():
+            rollups = _build_rollups(UserAnswer.objects.filter(user_id__in=chunk, id__lte=high_water))
+            # A refresh running meanwhile may already have rebuilt some of these users
+            DailyAnswerRollup.objects.filter(user_id__in=chunk).delete()
+            DailyAnswerRollup.objects.bulk_create(rollups)
+        rebuilt += len({(rollup.user_id, rollup.date) for rollup in rollups})
+
+    # Answers that arrived meanwhile are past high_water and picked up by the next refresh
+    RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).update(last_answer_id=high_water)
+    return rebuilt
+
+
+def format_duration(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes = remainder // 60
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+def get_user_analytics(user):
+    """Summarise a user's rollups for the analytics page in two queries."""
+    rollups = DailyAnswerRollup.objects.filter(user=user)
+
+    totals = rollups.aggregate(
+        topics_visited=Count('topic', distinct=True),
+        attempts=Sum('attempts'),
+        correct=Sum('correct_count'),
+        total_time=Sum('total_time'),
+    )
+    attempts = totals['attempts'] or 0
+
+    topic_stats = []
+    topic_rows = (
+        rollups.values('topic_id', 'topic__name')
+        .annotate(attempts=Sum('attempts'), correct=Sum('correct_count'), total_time=Sum('total_time'))
+        .order_by('-attempts')
+    )
+    for row in topic_rows:
+        topic_stats.append({
+            'name': row['topic__name'],
+            'attempts': row['attempts'],
+            'accuracy': round(100 * row['correct'] / row['attempts']) if row['attempts'] else 0,
+            'average_time': round(row['total_time'] / row['attempts']) if row['attempts'] else 0,
+        })
+
+    return {
+        'topics_visited': totals['topics_visited'],
+        'questions_completed': attempts,
+        'average_score': round(100 * (totals['correct'] or 0) / attempts) if attempts else 0,
+        'time_spent': format_duration(totals['total_time'] or 0),
+        'topic_stats': topic_stats,
+    }
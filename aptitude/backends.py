@@ -1,6 +1,10 @@
+import time
+
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
 
+from .metrics import auth_latency
+
 User = get_user_model()
 
 class EmailBackend(ModelBackend):
@@ -9,6 +13,12 @@ class EmailBackend(ModelBackend):
     """
     
     def authenticate(self, request, username=None, password=None, **kwargs):
+        started = time.perf_counter()
+        user = self._authenticate(username, password, **kwargs)
+        auth_latency.observe(time.perf_counter() - started, result='success' if user else 'failure')
+        return user
+
+    def _authenticate(self, username, password, **kwargs):
         if username is None:
             username = kwargs.get('email')
         
@@ -0,0 +1,118 @@
+"""
+Catalog queries shared by the student and boss screens, cached under a version
+that the signal handlers bump on every catalog change.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+
+from .metrics import record_cache
+from .models import Note, Option, Question, Resource, Subtopic, Topic, VideoLesson
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_CHANGED_KEY = 'catalog:changed_at'
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+QUESTION_PAGE_SIZE = 50
+
+
+def question_page(subtopic, difficulty=None, after_id=0, page_size=QUESTION_PAGE_SIZE):
+    """
+    Return (questions, next_after_id) for one keyset page of a subtopic's questions.
+
+    Options are prefetched with one query for the whole page. ``next_after_id``
+    is None on the last page.
+    """
+    questions = Question.objects.filter(subtopic=subtopic, id__gt=after_id)
+    if difficulty:
+        questions = questions.filter(difficulty=difficulty)
+    questions = list(
+        questions.order_by('id')
+        .prefetch_related(Prefetch('option_set', queryset=Option.objects.order_by('id')))[:page_size + 1]
+    )
+
+    next_after_id = None
+    if len(questions) > page_size:
+        questions = questions[:page_size]
+        next_after_id = questions[-1].id
+    return questions, next_after_id
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version key never revives stale entries
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog entry."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    # Deletes leave no updated_at behind, so remember when the catalog last changed
+    cache.set(CATALOG_CHANGED_KEY, timezone.now(), None)
+
+
+def get_catalog_last_modified():
+    """Latest change to any catalog content, computed once per catalog version."""
+    key = f'catalog:last_modified:v{get_catalog_version()}'
+    last_modified = cache.get(key)
+    record_cache('catalog_last_modified', last_modified is not None)
+    if last_modified is None:
+        candidates = [
+            model.objects.aggregate(latest=Max('updated_at'))['latest']
+            for model in (Topic, Subtopic, VideoLesson, Note, Resource)
+        ]
+        candidates.append(cache.get(CATALOG_CHANGED_KEY))
+        candidates = [candidate for candidate in candidates if candidate]
+        last_modified = max(candidates) if candidates else timezone.now()
+        cache.set(key, last_modified, CATALOG_TIMEOUT)
+    return last_modified
+
+
+def _build_catalog():
+    subtopics_by_topic = {}
+    subtopic_rows = Subtopic.objects.order_by('topic_id', 'display_order').values(
+        'id', 'topic_id', 'name', 'display_order', 'easy_count', 'medium_count', 'hard_count'
+    )
+    for row in subtopic_rows:
+        subtopics_by_topic.setdefault(row['topic_id'], []).append({
+            'id': row['id'],
+            'name': row['name'],
+            'display_order': row['display_order'],
+            'easy': row['easy_count'],
+            'medium': row['medium_count'],
+            'hard': row['hard_count'],
+            'total': row['easy_count'] + row['medium_count'] + row['hard_count'],
+        })
+
+    topics = {}
+    categories = {choice: [] for choice, _ in Topic.CATEGORY_CHOICES}
+    for row in Topic.objects.order_by('category', 'display_order').values('id', 'name', 'category', 'display_order'):
+        topic = {**row, 'subtopics': subtopics_by_topic.get(row['id'], [])}
+        topics[row['id']] = topic
+        categories.setdefault(row['category'], []).append(topic)
+
+    return {'topics': topics, 'categories': categories}
+
+
+def get_catalog():
+    """
+    Return the cached catalog:
+    {'topics': {topic_id: topic}, 'categories': {category: [topic, ...]}}
+    where each topic carries its ordered subtopics with easy/medium/hard/total counts.
+    """
+    key = f'catalog:v{get_catalog_version()}'
+    catalog = cache.get(key)
+    record_cache('catalog', catalog is not None)
+    if catalog is None:
+        catalog = _build_catalog()
+        cache.set(key, catalog, CATALOG_TIMEOUT)
+    return catalog
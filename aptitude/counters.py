@@ -0,0 +1,86 @@
+"""
+Denormalized counters for the boss screens, kept current by aptitude/signals.py.
+
+The same signals bump the catalog version. bulk_create and QuerySet.update()
+send no signals, so code using them adjusts the counters and bumps the version
+itself. reconcile_counters() recomputes every counter from scratch.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Question, SiteCounter, Subtopic, Topic, User
+
+TOPICS = 'topics'
+SUBTOPICS = 'subtopics'
+QUESTIONS = 'questions'
+STUDENTS = 'students'
+COUNTER_NAMES = (TOPICS, SUBTOPICS, QUESTIONS, STUDENTS)
+
+DIFFICULTY_FIELDS = {
+    'easy': 'easy_count',
+    'medium': 'medium_count',
+    'hard': 'hard_count',
+}
+
+
+def adjust_counter(name, delta):
+    if not delta:
+        return
+    if not SiteCounter.objects.filter(name=name).update(value=F('value') + delta):
+        counter, _ = SiteCounter.objects.get_or_create(name=name)
+        SiteCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def adjust_subtopic_count(topic_id, delta):
+    Topic.objects.filter(pk=topic_id).update(subtopic_count=F('subtopic_count') + delta)
+    adjust_counter(SUBTOPICS, delta)
+
+
+def adjust_question_counts(deltas):
+    """Apply {(subtopic_id, difficulty): delta} to the subtopic and site question counts."""
+    total = 0
+    for (subtopic_id, difficulty), delta in deltas.items():
+        if not delta:
+            continue
+        field = DIFFICULTY_FIELDS[difficulty]
+        Subtopic.objects.filter(pk=subtopic_id).update(**{field: F(field) + delta})
+        total += delta
+    adjust_counter(QUESTIONS, total)
+
+
+def get_site_counters():
+    """Return {name: value} for every site counter, in one query."""
+    counters = dict.fromkeys(COUNTER_NAMES, 0)
+    # Other rows, such as the topic order sequence in aptitude/ordering.py, are not totals
+    counters.update(SiteCounter.objects.filter(name__in=COUNTER_NAMES).values_list('name', 'value'))
+    return counters
+
+
+def _count_subquery(queryset, group_field):
+    counts = queryset.values(group_field).annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(counts), Value(0))
+
+
+def reconcile_counters():
+    """Recompute every counter from the underlying tables. Returns the site totals."""
+    with transaction.atomic():
+        Topic.objects.update(subtopic_count=_count_subquery(
+            Subtopic.objects.filter(topic=OuterRef('pk')).order_by(), 'topic'
+        ))
+        Subtopic.objects.update(**{
+            field: _count_subquery(
+                Question.objects.filter(subtopic=OuterRef('pk'), difficulty=difficulty).order_by(), 'subtopic'
+            )
+            for difficulty, field in DIFFICULTY_FIELDS.items()
+        })
+
+        totals = {
+            TOPICS: Topic.objects.count(),
+            SUBTOPICS: Subtopic.objects.count(),
+            QUESTIONS: Question.objects.count(),
+            STUDENTS: User.objects.filter(role='student').count(),
+        }
+        for name, value in totals.items():
+            SiteCounter.objects.update_or_create(name=name, defaults={'value': value})
+    return totals
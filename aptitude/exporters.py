@@ -0,0 +1,124 @@
+"""
+Streaming JSONL/CSV export of question banks and answer history, in the
+format importers.import_questions() reads back.
+"""
+import csv
+import datetime
+import json
+
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Option, Question, UserAnswer
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+DEFAULT_CHUNK_SIZE = 2000
+
+QUESTION_CSV_COLUMNS = [
+    'id', 'subtopic_id', 'difficulty', 'text', 'time_limit',
+    'option1', 'option2', 'option3', 'option4', 'correct_option',
+]
+ANSWER_CSV_COLUMNS = [
+    'id', 'user_id', 'question_id', 'option_id', 'is_correct', 'time_taken', 'answered_at',
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the value straight back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def parse_day(value):
+    """Parse a YYYY-MM-DD filter value, raising ValueError when it is not a valid date."""
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f"Invalid date '{value}'")
+    return day
+
+
+def _date_range_filter(field, since=None, until=None):
+    """Filter kwargs for an inclusive date range on a datetime field."""
+    tz = timezone.get_current_timezone()
+    filters = {}
+    if since:
+        filters[f'{field}__gte'] = datetime.datetime.combine(since, datetime.time.min, tzinfo=tz)
+    if until:
+        end = datetime.datetime.combine(until, datetime.time.min, tzinfo=tz) + datetime.timedelta(days=1)
+        filters[f'{field}__lt'] = end
+    return filters
+
+
+def _question_rows(topic_id=None, subtopic_id=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    questions = Question.objects.filter(**_date_range_filter('created_at', since, until))
+    if topic_id:
+        questions = questions.filter(subtopic__topic_id=topic_id)
+    if subtopic_id:
+        questions = questions.filter(subtopic_id=subtopic_id)
+    questions = questions.order_by('id').prefetch_related(
+        Prefetch('option_set', queryset=Option.objects.order_by('id'))
+    )
+
+    for question in questions.iterator(chunk_size=chunk_size):
+        yield {
+            'id': question.id,
+            'subtopic_id': question.subtopic_id,
+            'difficulty': question.difficulty,
+            'text': question.text,
+            'time_limit': question.time_limit,
+            'options': [
+                {'text': option.text, 'is_correct': option.is_correct}
+                for option in question.option_set.all()
+            ],
+        }
+
+
+def export_questions(fmt, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """
+    Yield the filtered question bank as JSONL or CSV lines. CSV has the
+    import layout, option1..option4: options after the fourth are left out,
+    so export questions with more options as JSONL.
+    """
+    rows = _question_rows(chunk_size=chunk_size, **filters)
+
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(QUESTION_CSV_COLUMNS)
+    for row in rows:
+        # The CSV layout only has room for four options
+        options = row['options'][:4]
+        texts = [option['text'] for option in options] + [''] * (4 - len(options))
+        correct = next((i for i, option in enumerate(options, start=1) if option['is_correct']), '')
+        yield writer.writerow([
+            row['id'], row['subtopic_id'], row['difficulty'], row['text'], row['time_limit'],
+            *texts, correct,
+        ])
+
+
+def export_answers(fmt, topic_id=None, subtopic_id=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the filtered UserAnswer history as JSONL or CSV lines."""
+    answers = UserAnswer.objects.filter(**_date_range_filter('answered_at', since, until))
+    if topic_id:
+        answers = answers.filter(question__subtopic__topic_id=topic_id)
+    if subtopic_id:
+        answers = answers.filter(question__subtopic_id=subtopic_id)
+    rows = answers.order_by('id').values_list(*ANSWER_CSV_COLUMNS).iterator(chunk_size=chunk_size)
+
+    if fmt == 'jsonl':
+        for row in rows:
+            record = dict(zip(ANSWER_CSV_COLUMNS, row))
+            record['answered_at'] = record['answered_at'].isoformat()
+            yield json.dumps(record) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ANSWER_CSV_COLUMNS)
+    for row in rows:
+        yield writer.writerow([*row[:-1], row[-1].isoformat()])
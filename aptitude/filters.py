@@ -0,0 +1,23 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class QueryParamFilterBackend(BaseFilterBackend):
+    """
+    Filters a viewset's queryset from query parameters.
+
+    Views declare ``filter_fields`` mapping a query parameter to an ORM lookup,
+    e.g. ``{'subtopic': 'subtopic_id'}``; only indexed columns should be listed.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        filter_fields = getattr(view, 'filter_fields', {})
+        for param, lookup in filter_fields.items():
+            value = request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (TypeError, ValueError):
+                raise ValidationError({param: f"Invalid value '{value}'."})
+        return queryset
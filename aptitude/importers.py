@@ -0,0 +1,264 @@
+"""Streaming CSV/JSONL question import, written in chunks with bulk_create."""
+import csv
+import json
+import time
+from collections import Counter
+
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .counters import adjust_question_counts
+from .models import Option, Question, Subtopic
+
+DIFFICULTIES = {choice for choice, _ in Question.DIFFICULTY_CHOICES}
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportReport:
+    """Running totals of an import, including the first MAX_REPORTED_ERRORS row errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed
+        return self.created / elapsed if elapsed else 0
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def detect_format(filename):
+    """Guess the import format from a file name."""
+    if filename.lower().endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+class _Lines:
+    """Decode a stream line by line, reporting lines that are not UTF-8 and remembering the line number."""
+
+    def __init__(self, stream, report):
+        self.stream = iter(stream)
+        self.report = report
+        self.number = 0
+
+    def __iter__(self):
+        while True:
+            try:
+                raw = next(self.stream)
+            except StopIteration:
+                return
+            except UnicodeDecodeError:
+                # A text stream cannot resume after a decoding error
+                self.report.add_error(self.number + 1, "File is not valid UTF-8, stopped reading here")
+                return
+            self.number += 1
+            if isinstance(raw, bytes):
+                try:
+                    raw = raw.decode('utf-8-sig' if self.number == 1 else 'utf-8')
+                except UnicodeDecodeError:
+                    self.report.add_error(self.number, "Line is not valid UTF-8")
+                    continue
+            yield raw
+
+
+def _read_csv(lines):
+    reader = csv.DictReader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield lines.number, RowError(f"Malformed CSV: {exc}")
+            continue
+        options = [row.get(f'option{i}') for i in range(1, 5)]
+        correct = (row.get('correct_option') or '').strip()
+        # The last physical line of the row, so quoted newlines are counted
+        yield lines.number, {
+            'subtopic_id': row.get('subtopic_id'),
+            'difficulty': row.get('difficulty'),
+            'text': row.get('text'),
+            'time_limit': row.get('time_limit') or 60,
+            'options': [
+                {'text': text, 'is_correct': correct == str(i)}
+                for i, text in enumerate(options, start=1)
+                if text
+            ],
+        }
+
+
+def _read_jsonl(lines):
+    for raw in lines:
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError as exc:
+            yield lines.number, RowError(f"Invalid JSON: {exc}")
+            continue
+        if not isinstance(row, dict):
+            yield lines.number, RowError("Expected a JSON object")
+            continue
+        yield lines.number, row
+
+
+def _clean_row(row, default_subtopic_id=None):
+    """Validate one parsed row and return normalised values or raise RowError."""
+    subtopic_id = row.get('subtopic_id') or default_subtopic_id
+    try:
+        subtopic_id = int(subtopic_id)
+    except (TypeError, ValueError):
+        raise RowError("Missing or invalid subtopic_id")
+
+    difficulty = str(row.get('difficulty') or '').strip().lower()
+    if difficulty not in DIFFICULTIES:
+        raise RowError(f"Invalid difficulty '{difficulty}'")
+
+    text = str(row.get('text') or '').strip()
+    if not text:
+        raise RowError("Question text is required")
+    if '\x00' in text:
+        raise RowError("Question text contains a NUL character")
+
+    try:
+        time_limit = int(row.get('time_limit', 60))
+    except (TypeError, ValueError):
+        raise RowError("time_limit must be an integer")
+    if time_limit <= 0:
+        raise RowError("time_limit must be positive")
+
+    options = row.get('options') or []
+    if not isinstance(options, list) or len(options) < 2:
+        raise RowError("At least two options are required")
+    cleaned_options = []
+    for option in options:
+        if not isinstance(option, dict) or not str(option.get('text') or '').strip():
+            raise RowError("Every option needs a text")
+        if '\x00' in str(option['text']):
+            raise RowError("Option text contains a NUL character")
+        cleaned_options.append((str(option['text']).strip(), bool(option.get('is_correct'))))
+    if sum(1 for _, is_correct in cleaned_options if is_correct) != 1:
+        raise RowError("Exactly one option must be correct")
+
+    return {
+        'subtopic_id': subtopic_id,
+        'difficulty': difficulty,
+        'text': text,
+        'time_limit': time_limit,
+        'options': cleaned_options,
+    }
+
+
+def _write_batch(batch, report, created_by=None):
+    """Insert a batch of cleaned rows; rows pointing at unknown subtopics are reported."""
+    subtopic_ids = set(
+        Subtopic.objects.filter(id__in={row['subtopic_id'] for _, row in batch}).values_list('id', flat=True)
+    )
+    rows = []
+    for line, row in batch:
+        if row['subtopic_id'] in subtopic_ids:
+            rows.append(row)
+        else:
+            report.add_error(line, f"Subtopic {row['subtopic_id']} does not exist")
+    if not rows:
+        return
+
+    with transaction.atomic():
+        questions = Question.objects.bulk_create([
+            Question(
+                subtopic_id=row['subtopic_id'],
+                difficulty=row['difficulty'],
+                text=row['text'],
+                time_limit=row['time_limit'],
+                created_by=created_by,
+            )
+            for row in rows
+        ])
+        Option.objects.bulk_create([
+            Option(question=question, text=text, is_correct=is_correct)
+            for question, row in zip(questions, rows)
+            for text, is_correct in row['options']
+        ])
+        # No signals for bulk_create, see aptitude/counters.py
+        adjust_question_counts(Counter((row['subtopic_id'], row['difficulty']) for row in rows))
+    report.created += len(rows)
+
+
+def import_questions(stream, fmt, created_by=None, default_subtopic_id=None,
+                     batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Import questions and options from a stream in CSV or JSONL format. A
+    binary stream is decoded as UTF-8 line by line, so undecodable lines
+    become row errors, as do malformed CSV lines.
+
+    CSV columns:
+        subtopic_id, difficulty, text, time_limit, option1..option4, correct_option (1-4)
+
+    JSONL lines:
+        {"subtopic_id": 1, "difficulty": "easy", "text": "...", "time_limit": 60,
+         "options": [{"text": "...", "is_correct": true}, ...]}
+
+    ``progress`` is called with the report after every written batch.
+    Returns the ImportReport.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}'")
+
+    report = ImportReport()
+    lines = _Lines(stream, report)
+    rows = _read_csv(lines) if fmt == 'csv' else _read_jsonl(lines)
+
+    batch = []
+    for line, row in rows:
+        if isinstance(row, RowError):
+            report.add_error(line, str(row))
+            continue
+        try:
+            batch.append((line, _clean_row(row, default_subtopic_id)))
+        except RowError as exc:
+            report.add_error(line, str(exc))
+            continue
+
+        if len(batch) >= batch_size:
+            _write_batch(batch, report, created_by)
+            batch = []
+            if progress:
+                progress(report)
+
+    if batch:
+        _write_batch(batch, report, created_by)
+        if progress:
+            progress(report)
+
+    # bulk_create skips the model signals that keep the catalog cache fresh
+    if report.created:
+        bump_catalog_version()
+
+    return report
@@ -0,0 +1,143 @@
+"""
+Answer ingestion: with settings.ANSWER_INGEST['ASYNC'] on, answers are buffered
+and written in batches by a background thread.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, connection
+
+from .metrics import answers_submitted
+from .progress import pending_answer, record_answers
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': False,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.5,
+    'RETRY_DELAY': 1.0,
+}
+
+
+def get_ingest_setting(name):
+    return getattr(settings, 'ANSWER_INGEST', {}).get(name, DEFAULTS[name])
+
+
+class AnswerBuffer:
+    """Thread-safe buffer of PendingAnswers with a background flusher."""
+
+    def __init__(self):
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, answer):
+        with self._condition:
+            self._pending.append(answer)
+            if len(self._pending) >= get_ingest_setting('BATCH_SIZE'):
+                self._condition.notify()
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='answer-ingest', daemon=True)
+                self._thread.start()
+
+    def _take_batch(self):
+        batch_size = get_ingest_setting('BATCH_SIZE')
+        with self._condition:
+            return [self._pending.popleft() for _ in range(min(batch_size, len(self._pending)))]
+
+    def _requeue(self, batch):
+        with self._condition:
+            self._pending.extendleft(reversed(batch))
+
+    def flush(self):
+        """
+        Write everything buffered so far. A batch that hits OperationalError
+        (e.g. a locked database) is requeued and False returned. After any
+        other error the batch is written one answer at a time, and answers
+        that still fail are logged and dropped.
+        """
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return True
+                try:
+                    close_old_connections()
+                    record_answers(batch)
+                except OperationalError:
+                    logger.exception("Writing %d buffered answers failed, will retry", len(batch))
+                    self._requeue(batch)
+                    return False
+                except Exception:
+                    logger.exception("Writing %d buffered answers failed, writing them one by one", len(batch))
+                    if not self._write_each(batch):
+                        return False
+
+    def _write_each(self, batch):
+        for position, answer in enumerate(batch):
+            try:
+                record_answers([answer])
+            except OperationalError:
+                logger.exception("Writing a buffered answer failed, will retry")
+                self._requeue(batch[position:])
+                return False
+            except Exception:
+                logger.exception("Dropping an answer that cannot be written: %r", answer)
+        return True
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    if not self._stopping and len(self._pending) < get_ingest_setting('BATCH_SIZE'):
+                        self._condition.wait(get_ingest_setting('FLUSH_INTERVAL'))
+                    stopping = self._stopping
+                if not self.flush():
+                    time.sleep(get_ingest_setting('RETRY_DELAY'))
+                if stopping and not self._pending:
+                    return
+        finally:
+            connection.close()
+
+    def shutdown(self, timeout=10):
+        """Stop the worker and drain the buffer."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._pending:
+            self.flush()
+
+
+answer_buffer = AnswerBuffer()
+# Answers still buffered when a worker is killed outright are lost
+atexit.register(answer_buffer.shutdown)
+
+
+def submit_answer(user, question, option, time_taken):
+    """Accept an already validated answer, buffering it when async ingestion is on."""
+    answer = pending_answer(user, question, option, time_taken)
+    if get_ingest_setting('ASYNC'):
+        answer_buffer.submit(answer)
+    else:
+        record_answers([answer])
+    answers_submitted.inc(difficulty=answer.difficulty, correct='true' if answer.is_correct else 'false')
+    return answer
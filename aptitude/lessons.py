@@ -0,0 +1,72 @@
+"""Lesson page data for a subtopic, loaded in one pass and cached until its content changes."""
+from django.core.cache import cache
+from django.db.models import BooleanField, ExpressionWrapper, Prefetch, Q
+
+from .metrics import record_cache
+from .models import Note, Resource, Subtopic, VideoLesson
+
+LESSON_TIMEOUT = 60 * 60 * 24
+
+
+def lesson_cache_key(subtopic_id):
+    return f'lesson:{subtopic_id}'
+
+
+def invalidate_lesson(subtopic_id):
+    cache.delete(lesson_cache_key(subtopic_id))
+
+
+def _build_lesson_bundle(subtopic_id):
+    notes = (
+        Note.objects.order_by('id')
+        .defer('content')
+        .annotate(has_content=ExpressionWrapper(~Q(content=''), output_field=BooleanField()))
+    )
+    subtopic = (
+        Subtopic.objects
+        .filter(id=subtopic_id)
+        .prefetch_related(
+            Prefetch('videolesson_set', queryset=VideoLesson.objects.order_by('id')),
+            Prefetch('note_set', queryset=notes),
+            Prefetch('resource_set', queryset=Resource.objects.order_by('id')),
+        )
+        .first()
+    )
+    if subtopic is None:
+        return None
+
+    videos = list(subtopic.videolesson_set.all())
+    video = videos[0] if videos else None
+    return {
+        'subtopic': {
+            'id': subtopic.id,
+            'name': subtopic.name,
+            'topic': {'id': subtopic.topic_id},
+        },
+        'video': {'title': video.title, 'video_url': video.video_url} if video else None,
+        'notes': [
+            {
+                'id': note.id,
+                'heading': note.heading,
+                'has_content': note.has_content,
+                'file_url': note.file_url.url if note.file_url else '',
+            }
+            for note in subtopic.note_set.all()
+        ],
+        'resources': [
+            {'description': resource.description, 'link': resource.link}
+            for resource in subtopic.resource_set.all()
+        ],
+    }
+
+
+def get_lesson_bundle(subtopic_id):
+    """Return the cached lesson bundle for a subtopic, or None if it does not exist."""
+    key = lesson_cache_key(subtopic_id)
+    bundle = cache.get(key)
+    record_cache('lesson_bundle', bundle is not None)
+    if bundle is None:
+        bundle = _build_lesson_bundle(subtopic_id)
+        if bundle is not None:
+            cache.set(key, bundle, LESSON_TIMEOUT)
+    return bundle
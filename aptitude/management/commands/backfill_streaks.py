@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from aptitude.streaks import backfill_streaks
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's answer streak from the UserAnswer history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        created = backfill_streaks(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {created} streaks"))
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from aptitude.exporters import DEFAULT_CHUNK_SIZE, FORMATS, export_answers, export_questions, parse_day
+
+
+class Command(BaseCommand):
+    help = "Stream the question bank or the answer history out as JSONL or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['questions', 'answers'])
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', help="File to write to, defaults to stdout")
+        parser.add_argument('--topic', type=int)
+        parser.add_argument('--subtopic', type=int)
+        parser.add_argument('--since', type=parse_day, help="YYYY-MM-DD, inclusive")
+        parser.add_argument('--until', type=parse_day, help="YYYY-MM-DD, inclusive")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        exporter = export_questions if options['dataset'] == 'questions' else export_answers
+        lines = exporter(
+            options['format'],
+            topic_id=options['topic'],
+            subtopic_id=options['subtopic'],
+            since=options['since'],
+            until=options['until'],
+            chunk_size=options['chunk_size'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
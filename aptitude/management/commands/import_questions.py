@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from aptitude.importers import DEFAULT_BATCH_SIZE, FORMATS, detect_format, import_questions
+from aptitude.models import User
+
+
+class Command(BaseCommand):
+    help = "Bulk import questions and options from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--subtopic', type=int, help="Subtopic id for rows that do not set one")
+        parser.add_argument('--user', help="Email of the user recorded as the author")
+
+    def handle(self, *args, **options):
+        created_by = None
+        if options['user']:
+            try:
+                created_by = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        fmt = options['format'] or detect_format(options['path'])
+
+        def progress(report):
+            self.stdout.write(f"{report.created} questions imported ({report.rows_per_second:.0f} rows/s)")
+
+        with open(options['path'], 'rb') as stream:
+            report = import_questions(
+                stream,
+                fmt,
+                created_by=created_by,
+                default_subtopic_id=options['subtopic'],
+                batch_size=options['batch_size'],
+                progress=progress,
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... {report.error_count - len(report.errors)} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} questions in {report.elapsed:.1f}s "
+            f"({report.rows_per_second:.0f} rows/s), {report.error_count} rows rejected"
+        ))
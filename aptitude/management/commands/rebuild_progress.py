@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from aptitude.progress import rebuild_progress
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user practice progress table from the UserAnswer history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_progress(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} progress rows"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from aptitude.adaptive import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the adaptive practice ratings from the UserAnswer history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        users, questions = rebuild_ratings(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {users} user and {questions} question ratings"))
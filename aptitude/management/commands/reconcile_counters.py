@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from aptitude.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized topic, subtopic, question and student counters"
+
+    def handle(self, *args, **options):
+        totals = reconcile_counters()
+        summary = ", ".join(f"{value} {name}" for name, value in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters: {summary}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from aptitude.analytics import rebuild_rollups, refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Fold new answers into the daily analytics rollups (run periodically, e.g. from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild all rollups from the full answer history")
+
+    def handle(self, *args, **options):
+        if options['full']:
+            rebuilt = rebuild_rollups()
+        else:
+            rebuilt = refresh_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {rebuilt} user-days"))
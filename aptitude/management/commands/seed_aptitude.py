@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aptitude.models import User
+from aptitude.seeding import DEFAULT_CHUNK_SIZE, DEFAULT_PASSWORD, seed_dataset
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic dataset for load tests and benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topics', type=int, default=10)
+        parser.add_argument('--subtopics', type=int, default=100)
+        parser.add_argument('--questions', type=int, default=10000)
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--bosses', type=int, default=1)
+        parser.add_argument('--answers', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=30, help="Spread answers over this many days")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', help="Name prefix for generated rows, defaults to seed<seed>")
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Password for every generated user")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help="Do not rebuild progress, streaks, analytics rollups and ratings afterwards")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix'] or f"seed{options['seed']}"
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"Users with prefix '{prefix}' already exist, pick another --seed or --prefix")
+
+        started = time.monotonic()
+
+        def progress(counts):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{counts['answers']} answers written ({counts['answers'] / elapsed:.0f} rows/s)")
+
+        try:
+            counts = seed_dataset(
+                topics=options['topics'],
+                subtopics=options['subtopics'],
+                questions=options['questions'],
+                students=options['students'],
+                bosses=options['bosses'],
+                answers=options['answers'],
+                days=options['days'],
+                seed=options['seed'],
+                prefix=prefix,
+                password=options['password'],
+                chunk_size=options['chunk_size'],
+                rebuild=not options['skip_rebuild'],
+                progress=progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {time.monotonic() - started:.1f}s"))
@@ -0,0 +1,235 @@
+"""
+Prometheus-style metrics, aggregated in each process and merged across workers
+through one file per process in settings.METRICS['DIR'].
+"""
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'DIR': os.path.join(tempfile.gettempdir(), 'aptitude-metrics'),
+    'FLUSH_INTERVAL': 1.0,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TOKEN': None,
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def get_metrics_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def scrape_allowed(request):
+    """
+    Whether a request may read /metrics: with METRICS['TOKEN'] set it must
+    carry the token as a bearer token, otherwise come from ALLOWED_IPS.
+    """
+    if not get_metrics_setting('ENABLED'):
+        return False
+    token = get_metrics_setting('TOKEN')
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode())
+    return request.META.get('REMOTE_ADDR') in get_metrics_setting('ALLOWED_IPS')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.record(self, self._key(labels), amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        registry.record(self, self._key(labels), value)
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    """This process's metric values, flushed to its file in the metrics directory."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def record(self, metric, key, value):
+        if not get_metrics_setting('ENABLED'):
+            return
+        with self.lock:
+            series = self.values.setdefault(metric.name, {})
+            if metric.kind == 'counter':
+                series[key] = series.get(key, 0) + value
+            else:
+                state = series.get(key)
+                if state is None:
+                    state = series[key] = {'buckets': [0] * len(metric.buckets), 'sum': 0.0, 'count': 0}
+                for i, bound in enumerate(metric.buckets):
+                    if value <= bound:
+                        state['buckets'][i] += 1
+                state['sum'] += value
+                state['count'] += 1
+            due = time.monotonic() - self.last_flush >= get_metrics_setting('FLUSH_INTERVAL')
+        if due:
+            self.flush()
+
+    def _path(self):
+        return os.path.join(get_metrics_setting('DIR'), f'{os.getpid()}.json')
+
+    def flush(self):
+        # Serialized so the temp file is never renamed away under another thread
+        with self.flush_lock:
+            with self.lock:
+                self.last_flush = time.monotonic()
+                snapshot = {
+                    name: [[list(key), value] for key, value in series.items()]
+                    for name, series in self.values.items()
+                }
+            try:
+                directory = get_metrics_setting('DIR')
+                os.makedirs(directory, exist_ok=True)
+                path = self._path()
+                # Write then rename so a scrape never reads a half-written file
+                temporary = f'{path}.tmp'
+                with open(temporary, 'w', encoding='utf-8') as output:
+                    json.dump(snapshot, output)
+                os.replace(temporary, path)
+            except OSError:
+                # Metrics must never fail the request that recorded them
+                logger.exception("Writing metrics to %s failed", get_metrics_setting('DIR'))
+
+    def collect(self):
+        """Merge the files of every process into {name: {label values: value}}."""
+        self.flush()
+        merged = {}
+        directory = get_metrics_setting('DIR')
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename), encoding='utf-8') as source:
+                    snapshot = json.load(source)
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for key, value in series:
+                    key = tuple(key)
+                    if metric.kind == 'counter':
+                        target[key] = target.get(key, 0) + value
+                    elif key not in target:
+                        target[key] = {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                    else:
+                        state = target[key]
+                        state['buckets'] = [a + b for a, b in zip(state['buckets'], value['buckets'])]
+                        state['sum'] += value['sum']
+                        state['count'] += value['count']
+        return merged
+
+
+registry = Registry()
+
+
+def _labels(metric, key, **extra):
+    pairs = list(zip(metric.labelnames, key)) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_metrics():
+    """Render the merged metrics in the Prometheus text exposition format."""
+    merged = registry.collect()
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged.get(name, {}).items()):
+            if metric.kind == 'counter':
+                lines.append(f'{name}{_labels(metric, key)} {value}')
+                continue
+            for bound, count in zip(metric.buckets, value['buckets']):
+                lines.append(f'{name}_bucket{_labels(metric, key, le=bound)} {count}')
+            lines.append(f'{name}_bucket{_labels(metric, key, le="+Inf")} {value["count"]}')
+            lines.append(f'{name}_sum{_labels(metric, key)} {value["sum"]}')
+            lines.append(f'{name}_count{_labels(metric, key)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+answers_submitted = Counter(
+    'aptitude_answers_submitted_total', "Practice answers accepted", ['difficulty', 'correct'],
+)
+view_latency = Histogram(
+    'aptitude_view_seconds', "Request latency by view", ['view', 'method'],
+)
+view_queries = Histogram(
+    'aptitude_view_queries', "Database queries per request by view", ['view'], buckets=QUERY_BUCKETS,
+)
+auth_latency = Histogram(
+    'aptitude_auth_seconds', "EmailBackend.authenticate latency", ['result'],
+)
+cache_requests = Counter(
+    'aptitude_cache_requests_total', "Application cache lookups", ['cache', 'result'],
+)
+
+
+def record_cache(name, hit):
+    cache_requests.inc(cache=name, result='hit' if hit else 'miss')
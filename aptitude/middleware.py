@@ -0,0 +1,117 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, profiling
+from .routers import end_request, has_written, start_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_PIN_COOKIE = 'primary_pin'
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Keep a client's reads on the primary while the replica may still be
+    catching up with its writes.
+
+    Unsafe requests read from the primary throughout. Those, and any
+    request that wrote, set a short-lived cookie so the follow-up requests
+    (typically the redirect after a POST) read from the primary too.
+    Unsafe requests count even when their writes were handed off, as
+    practice answers are to aptitude.ingest.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in SAFE_METHODS or PRIMARY_PIN_COOKIE in request.COOKIES
+        tokens = start_request(pinned)
+        try:
+            response = self.get_response(request)
+            if has_written() or request.method not in SAFE_METHODS:
+                response.set_cookie(
+                    PRIMARY_PIN_COOKIE, '1',
+                    max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            end_request(tokens)
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in request profiling, see aptitude/profiling.py.
+
+    Sampled responses get a Server-Timing header (total, sql, tpl, py) and a
+    JSON line in the profiling log. Put it first in MIDDLEWARE so the other
+    middleware is measured too.
+    """
+
+    def __init__(self, get_response):
+        if not profiling.get_profiling_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        profiling.install_template_timing()
+
+    def __call__(self, request):
+        if random.random() >= profiling.get_profiling_setting('SAMPLE_RATE'):
+            return self.get_response(request)
+
+        profile, token = profiling.start_profile()
+        trace_memory = profiling.get_profiling_setting('TRACEMALLOC')
+        started_trace = profiling.start_memory_trace() if trace_memory else False
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - profile.started
+            if trace_memory:
+                profiling.stop_memory_trace(profile, started_trace)
+            profiling.end_profile(token)
+
+        response['Server-Timing'] = profile.server_timing(total)
+        profiling.write_record(profile.as_dict(request, response, total))
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record latency and query count per view into aptitude.metrics.
+
+    Queries are counted with an execute_wrapper rather than the debug query
+    log, so the cost is one counter increment per statement.
+    """
+
+    def __init__(self, get_response):
+        if not metrics.get_metrics_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        # Unmatched paths share one label so scanners cannot grow the series without bound
+        view = match.view_name if match else 'unmatched'
+        metrics.view_latency.observe(elapsed, view=view, method=request.method)
+        metrics.view_queries.observe(queries[0], view=view)
+        return response
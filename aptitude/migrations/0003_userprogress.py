@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def compute_progress(apps, schema_editor):
+    """Fill UserProgress from UserAnswer, as aptitude.progress.rebuild_progress() does."""
+    UserAnswer = apps.get_model('aptitude', 'UserAnswer')
+    UserProgress = apps.get_model('aptitude', 'UserProgress')
+    rows = (
+        UserAnswer.objects
+        .values('user_id', 'question__subtopic_id', 'question__difficulty')
+        .annotate(
+            solved=Count('question', distinct=True),
+            correct=Count('question', filter=Q(is_correct=True), distinct=True),
+            total_time=Sum('time_taken'),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        batch.append(UserProgress(
+            user_id=row['user_id'],
+            subtopic_id=row['question__subtopic_id'],
+            difficulty=row['question__difficulty'],
+            solved_count=row['solved'],
+            correct_count=row['correct'],
+            total_time=row['total_time'] or 0,
+        ))
+        if len(batch) >= 1000:
+            UserProgress.objects.bulk_create(batch)
+            batch = []
+    UserProgress.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0002_alter_note_file_url_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('boss', 'Boss'), ('student', 'Student')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=10)),
+                ('solved_count', models.IntegerField(default=0, help_text='Distinct questions answered')),
+                ('correct_count', models.IntegerField(default=0, help_text='Distinct questions answered correctly')),
+                ('total_time', models.IntegerField(default=0, help_text='Total time taken in seconds')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subtopic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='aptitude.subtopic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'subtopic', 'difficulty'), name='unique_user_progress')],
+            },
+        ),
+        migrations.RunPython(compute_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0003_userprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_answer_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyAnswerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('difficulty', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('correct_count', models.IntegerField(default=0)),
+                ('total_time', models.IntegerField(default=0, help_text='Total time taken in seconds')),
+                ('time_p50', models.IntegerField(default=0, help_text='Median time taken in seconds')),
+                ('time_p90', models.IntegerField(default=0, help_text='90th percentile time taken in seconds')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='aptitude.topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'topic', 'difficulty'), name='unique_daily_answer_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0004_answer_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['subtopic', 'difficulty', 'id'], name='question_subtopic_diff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subtopic',
+            index=models.Index(fields=['topic', 'display_order'], name='subtopic_topic_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['category', 'display_order'], name='topic_category_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['user', 'question'], name='useranswer_user_question_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing_rows(apps, schema_editor):
+    Topic = apps.get_model('aptitude', 'Topic')
+    Subtopic = apps.get_model('aptitude', 'Subtopic')
+    Question = apps.get_model('aptitude', 'Question')
+    User = apps.get_model('aptitude', 'User')
+    SiteCounter = apps.get_model('aptitude', 'SiteCounter')
+
+    def count(queryset, group_field):
+        counts = queryset.order_by().values(group_field).annotate(count=Count('id')).values('count')
+        return Coalesce(Subquery(counts), Value(0))
+
+    Topic.objects.update(subtopic_count=count(Subtopic.objects.filter(topic=OuterRef('pk')), 'topic'))
+    Subtopic.objects.update(**{
+        f'{difficulty}_count': count(Question.objects.filter(subtopic=OuterRef('pk'), difficulty=difficulty), 'subtopic')
+        for difficulty in ('easy', 'medium', 'hard')
+    })
+    SiteCounter.objects.bulk_create([
+        SiteCounter(name='topics', value=Topic.objects.count()),
+        SiteCounter(name='subtopics', value=Subtopic.objects.count()),
+        SiteCounter(name='questions', value=Question.objects.count()),
+        SiteCounter(name='students', value=User.objects.filter(role='student').count()),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0006_useranswer_answered_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='subtopic',
+            name='easy_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subtopic',
+            name='hard_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subtopic',
+            name='medium_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='subtopic_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:02
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def drop_client_streaks(apps, schema_editor):
+    # Rows were posted by clients, possibly several per user, and may lack a date
+    apps.get_model('aptitude', 'UserStreak').objects.all().delete()
+
+
+def compute_streaks(apps, schema_editor):
+    """Recompute the streaks from UserAnswer, as aptitude.streaks.backfill_streaks() does."""
+    UserAnswer = apps.get_model('aptitude', 'UserAnswer')
+    UserStreak = apps.get_model('aptitude', 'UserStreak')
+    active_days = (
+        UserAnswer.objects
+        .annotate(day=TruncDate('answered_at'))
+        .values_list('user_id', 'day')
+        .distinct()
+        .order_by('user_id', 'day')
+    )
+
+    batch = []
+    streak = None
+    for user_id, day in active_days.iterator(chunk_size=2000):
+        if streak is None or streak.user_id != user_id:
+            if streak is not None:
+                batch.append(streak)
+            streak = UserStreak(user_id=user_id, date=day, streak_count=1, longest_streak=1)
+            continue
+        streak.streak_count = streak.streak_count + 1 if day - streak.date == datetime.timedelta(days=1) else 1
+        streak.date = day
+        streak.longest_streak = max(streak.longest_streak, streak.streak_count)
+        if len(batch) >= 2000:
+            UserStreak.objects.bulk_create(batch)
+            batch = []
+    if streak is not None:
+        batch.append(streak)
+    UserStreak.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0007_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_client_streaks, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='userstreak',
+            name='longest_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='userstreak',
+            name='date',
+            field=models.DateField(help_text='Last day with an answer'),
+        ),
+        migrations.AlterField(
+            model_name='userstreak',
+            name='streak_count',
+            field=models.IntegerField(help_text='Consecutive days with an answer, ending on date'),
+        ),
+        migrations.RunPython(compute_streaks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userstreak',
+            constraint=models.UniqueConstraint(fields=('user',), name='unique_user_streak'),
+        ),
+    ]
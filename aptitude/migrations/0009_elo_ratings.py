@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aptitude', '0008_server_side_streaks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionRating',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='elo_rating', serialize=False, to='aptitude.question')),
+                ('rating', models.FloatField()),
+                ('answer_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserSubtopicRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.FloatField()),
+                ('answer_count', models.IntegerField(default=0)),
+                ('subtopic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='aptitude.subtopic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'subtopic'), name='unique_user_subtopic_rating')],
+            },
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 # --------------------------
 # Custom User Model
@@ -27,6 +28,16 @@ class User(AbstractUser):
 # Core Entities
 # --------------------------
 
+def _save_kwargs_without_counters(instance, kwargs):
+    """Keep a full save() of an existing row from overwriting counters maintained with F() updates."""
+    if not instance._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+        kwargs['update_fields'] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in instance.COUNTER_FIELDS
+        ]
+    return kwargs
+
+
 class Topic(models.Model):
     CATEGORY_CHOICES = [
         ('Common', 'Common'),
@@ -36,21 +47,51 @@ class Topic(models.Model):
     name = models.CharField(max_length=100)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     display_order = models.IntegerField()
+    # Maintained by aptitude/counters.py
+    subtopic_count = models.IntegerField(default=0)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='topics_created')
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='topics_updated')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ('subtopic_count',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'display_order'], name='topic_category_order_idx'),
+        ]
+
+    def save(self, **kwargs):
+        super().save(**_save_kwargs_without_counters(self, kwargs))
+
 
 class Subtopic(models.Model):
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     display_order = models.IntegerField()
+    # Question counts per difficulty, maintained by aptitude/counters.py
+    easy_count = models.IntegerField(default=0)
+    medium_count = models.IntegerField(default=0)
+    hard_count = models.IntegerField(default=0)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='subtopics_created')
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='subtopics_updated')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ('easy_count', 'medium_count', 'hard_count')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'display_order'], name='subtopic_topic_order_idx'),
+        ]
+
+    def save(self, **kwargs):
+        super().save(**_save_kwargs_without_counters(self, kwargs))
+
+    @property
+    def question_count(self):
+        return self.easy_count + self.medium_count + self.hard_count
+
 
 class VideoLesson(models.Model):
     subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE)
@@ -97,6 +138,11 @@ class Question(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='questions_created')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['subtopic', 'difficulty', 'id'], name='question_subtopic_diff_idx'),
+        ]
+
 
 class Option(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
@@ -113,14 +159,98 @@ class UserAnswer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     option = models.ForeignKey(Option, on_delete=models.CASCADE)
     is_correct = models.BooleanField()
-    answered_at = models.DateTimeField(auto_now_add=True)
+    answered_at = models.DateTimeField(default=timezone.now)
     time_taken = models.IntegerField(help_text="Time taken in seconds")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'question'], name='useranswer_user_question_idx'),
+        ]
 
-class UserStreak(models.Model):
+
+class UserProgress(models.Model):
+    """Per-user practice progress for one subtopic and difficulty, kept up to date on every answer."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE)
+    difficulty = models.CharField(max_length=10, choices=Question.DIFFICULTY_CHOICES)
+    solved_count = models.IntegerField(default=0, help_text="Distinct questions answered")
+    correct_count = models.IntegerField(default=0, help_text="Distinct questions answered correctly")
+    total_time = models.IntegerField(default=0, help_text="Total time taken in seconds")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'subtopic', 'difficulty'], name='unique_user_progress'),
+        ]
+
+
+class DailyAnswerRollup(models.Model):
+    """Daily per-user, per-topic, per-difficulty summary of UserAnswer rows for analytics."""
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
-    streak_count = models.IntegerField()
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
+    difficulty = models.CharField(max_length=10, choices=Question.DIFFICULTY_CHOICES)
+    attempts = models.IntegerField(default=0)
+    correct_count = models.IntegerField(default=0)
+    total_time = models.IntegerField(default=0, help_text="Total time taken in seconds")
+    time_p50 = models.IntegerField(default=0, help_text="Median time taken in seconds")
+    time_p90 = models.IntegerField(default=0, help_text="90th percentile time taken in seconds")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'topic', 'difficulty'], name='unique_daily_answer_rollup'),
+        ]
+
+
+class RollupCheckpoint(models.Model):
+    """High-water mark of the last UserAnswer id folded into a rollup."""
+    name = models.CharField(max_length=50, unique=True)
+    last_answer_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SiteCounter(models.Model):
+    """A site-wide total (topics, subtopics, questions, students), maintained by aptitude/counters.py."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+
+class UserStreak(models.Model):
+    """One row per user, maintained from UserAnswer by aptitude/streaks.py."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField(help_text="Last day with an answer")
+    streak_count = models.IntegerField(help_text="Consecutive days with an answer, ending on date")
+    longest_streak = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user'], name='unique_user_streak'),
+        ]
+
+    def current_streak(self, today=None):
+        """The streak as seen on today: it lapses once a whole day passes without an answer."""
+        today = today or timezone.localdate()
+        return self.streak_count if (today - self.date).days <= 1 else 0
+
+
+class QuestionRating(models.Model):
+    """Elo rating of a question, maintained from UserAnswer by aptitude/adaptive.py."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='elo_rating')
+    rating = models.FloatField()
+    answer_count = models.IntegerField(default=0)
+
+
+class UserSubtopicRating(models.Model):
+    """A user's Elo rating within one subtopic, maintained from UserAnswer by aptitude/adaptive.py."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    subtopic = models.ForeignKey(Subtopic, on_delete=models.CASCADE)
+    rating = models.FloatField()
+    answer_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'subtopic'], name='unique_user_subtopic_rating'),
+        ]
 
 
 class NotificationSetting(models.Model):
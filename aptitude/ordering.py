@@ -0,0 +1,68 @@
+"""display_order maintenance for topics and subtopics."""
+from django.db import transaction
+from django.db.models import Case, F, Max, Value, When
+
+from .catalog import bump_catalog_version
+from .models import SiteCounter, Subtopic, Topic
+
+TOPIC_ORDER = 'topic_order'
+
+
+def _next_order(queryset, floor=0):
+    current = queryset.aggregate(max_order=Max('display_order'))['max_order'] or 0
+    return max(current, floor) + 1
+
+
+def _lock_topic_order():
+    # The TOPIC_ORDER row holds the last order handed out, so concurrent appends never share one
+    SiteCounter.objects.get_or_create(name=TOPIC_ORDER)
+    return SiteCounter.objects.select_for_update().get(name=TOPIC_ORDER)
+
+
+def append_topic(**fields):
+    """Create a topic at the end of the list."""
+    with transaction.atomic():
+        sequence = _lock_topic_order()
+        sequence.value = _next_order(Topic.objects, sequence.value)
+        sequence.save(update_fields=['value'])
+        return Topic.objects.create(display_order=sequence.value, **fields)
+
+
+def append_subtopic(topic, **fields):
+    """Create a subtopic at the end of its topic's list."""
+    with transaction.atomic():
+        Topic.objects.select_for_update().get(pk=topic.pk)
+        display_order = _next_order(Subtopic.objects.filter(topic=topic))
+        return Subtopic.objects.create(topic=topic, display_order=display_order, **fields)
+
+
+def _reorder(queryset, ordered_ids):
+    ordered_ids = list(ordered_ids)
+    if len(set(ordered_ids)) != len(ordered_ids):
+        raise ValueError("The order lists an id more than once")
+    if set(ordered_ids) != set(queryset.values_list('id', flat=True)):
+        raise ValueError("The order must list every id exactly once")
+
+    return queryset.update(display_order=Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ordered_ids, start=1)],
+        default=F('display_order'),
+    ))
+
+
+def reorder_topics(ordered_ids):
+    """Renumber every topic to follow ordered_ids. Returns the number of rows updated."""
+    with transaction.atomic():
+        _lock_topic_order()
+        updated = _reorder(Topic.objects.all(), ordered_ids)
+    # No signals for update(), see aptitude/counters.py
+    bump_catalog_version()
+    return updated
+
+
+def reorder_subtopics(topic, ordered_ids):
+    """Renumber a topic's subtopics to follow ordered_ids. Returns the number of rows updated."""
+    with transaction.atomic():
+        Topic.objects.select_for_update().get(pk=topic.pk)
+        updated = _reorder(Subtopic.objects.filter(topic=topic), ordered_ids)
+    bump_catalog_version()
+    return updated
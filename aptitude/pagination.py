@@ -0,0 +1,25 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Default API pagination: cursor over the primary key, no COUNT query, bounded page size."""
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class CatalogPagination(IdCursorPagination):
+    # Topics and subtopics are small rows, allow fetching a whole catalog level at once
+    page_size = 100
+    max_page_size = 500
+
+
+class OptionPagination(IdCursorPagination):
+    page_size = 100
+    max_page_size = 400
+
+
+class PracticeSetPagination(IdCursorPagination):
+    page_size = 20
+    max_page_size = 100
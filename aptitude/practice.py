@@ -0,0 +1,102 @@
+"""
+Practice sessions: the question list is kept in the user's session, so each
+step is a primary key lookup.
+"""
+from django.http import Http404
+
+from .adaptive import next_question_id
+from .models import Question
+
+
+PRACTICE_SESSION_KEY = "practice:current"
+
+
+def _adaptive_key(subtopic_id):
+    return f"adaptive:{subtopic_id}"
+
+
+def get_question_ids(request, subtopic_id, difficulty, refresh=False):
+    """Return the ordered question ids for this subtopic/difficulty, resolving them if needed."""
+    current = request.session.get(PRACTICE_SESSION_KEY)
+    if current and not refresh and current['subtopic'] == subtopic_id and current['difficulty'] == difficulty:
+        return current['ids']
+
+    question_ids = list(
+        Question.objects.filter(subtopic_id=subtopic_id, difficulty=difficulty)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    request.session[PRACTICE_SESSION_KEY] = {'subtopic': subtopic_id, 'difficulty': difficulty, 'ids': question_ids}
+    return question_ids
+
+
+def load_question(question_id):
+    """Fetch a single question by primary key with its options prefetched."""
+    return Question.objects.filter(id=question_id).prefetch_related('option_set').first()
+
+
+def get_practice_step(request, subtopic_id, difficulty, q_index):
+    """
+    Return (question_ids, question) for the given step of a practice session.
+
+    Opening the first question starts a new session and re-resolves the id list.
+    ``question`` is None once ``q_index`` runs past the end of the list.
+    """
+    refresh = q_index == 0 and request.method == "GET"
+    question_ids = get_question_ids(request, subtopic_id, difficulty, refresh=refresh)
+    if q_index >= len(question_ids):
+        return question_ids, None
+
+    question = load_question(question_ids[q_index])
+    if question is None:
+        # The question was deleted during the session, resolve the list again
+        question_ids = get_question_ids(request, subtopic_id, difficulty, refresh=True)
+        if q_index >= len(question_ids):
+            return question_ids, None
+        question = load_question(question_ids[q_index])
+
+    return question_ids, question
+
+
+def get_adaptive_step(request, subtopic_id):
+    """
+    Return (answered_count, question) for an adaptive session, choosing the
+    next question on GET when there is no current one. ``question`` is None
+    once every question in the subtopic has been answered in this session.
+    ``?restart`` on a GET starts the session over.
+    """
+    key = _adaptive_key(subtopic_id)
+    state = request.session.get(key)
+    if state is None or (request.method == "GET" and 'restart' in request.GET):
+        state = {'current': None, 'answered': []}
+
+    question = load_question(state['current']) if state['current'] else None
+    while question is None and request.method == "GET":
+        question_id = next_question_id(request.user.id, subtopic_id, exclude=set(state['answered']))
+        if question_id is None:
+            break
+        question = load_question(question_id)
+        if question is None:
+            # Deleted since the rating table was loaded
+            state['answered'].append(question_id)
+    state['current'] = question.id if question else None
+
+    request.session[key] = state
+    return len(state['answered']), question
+
+
+def finish_adaptive_step(request, subtopic_id):
+    """Mark the current question of an adaptive session as answered."""
+    key = _adaptive_key(subtopic_id)
+    state = request.session[key]
+    state['answered'].append(state['current'])
+    state['current'] = None
+    request.session[key] = state
+
+
+def get_selected_option(question, option_id):
+    """Return the chosen option from the question's prefetched options."""
+    for option in question.option_set.all():
+        if option.id == option_id:
+            return option
+    raise Http404("No Option matches the given query.")
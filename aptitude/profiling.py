@@ -0,0 +1,137 @@
+"""
+Per-request profiling for RequestProfilingMiddleware: SQL, template and Python
+time, repeated queries and optionally peak memory.
+"""
+import json
+import re
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import Template as DjangoBackendTemplate
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 1.0,
+    'LOG_FILE': None,
+    # Process-wide, so peaks from concurrent requests overlap; slows every allocation
+    'TRACEMALLOC': False,
+    # Report statements that ran at least this many times in one request
+    'DUPLICATE_THRESHOLD': 3,
+}
+
+_current = ContextVar('request_profile', default=None)
+_log_lock = threading.Lock()
+_NUMBERS = re.compile(r"\b\d+\b")
+
+
+def get_profiling_setting(name):
+    return getattr(settings, 'REQUEST_PROFILING', {}).get(name, DEFAULTS[name])
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.template_time = 0.0
+        self.peak_memory = None
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+            # Inlined literals (e.g. IN lists) would hide repeats of the same statement
+            self.statements[_NUMBERS.sub('?', sql)] += 1
+
+    def duplicates(self):
+        threshold = get_profiling_setting('DUPLICATE_THRESHOLD')
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self, total):
+        python = max(total - self.sql_time - self.template_time, 0)
+        return ", ".join([
+            f'total;dur={total * 1000:.1f}',
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'py;dur={python * 1000:.1f}',
+        ])
+
+    def as_dict(self, request, response, total):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'ts': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'peak_memory_kb': None if self.peak_memory is None else round(self.peak_memory / 1024, 1),
+            'duplicate_queries': self.duplicates(),
+        }
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def end_profile(token):
+    _current.reset(token)
+
+
+def write_record(record):
+    path = get_profiling_setting('LOG_FILE')
+    if not path:
+        return
+    line = json.dumps(record) + "\n"
+    with _log_lock, open(path, 'a', encoding='utf-8') as log:
+        log.write(line)
+
+
+def start_memory_trace():
+    """Start tracemalloc for this request; returns whether it has to be stopped afterwards."""
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+        return False
+    tracemalloc.start()
+    return True
+
+
+def stop_memory_trace(profile, started_here):
+    profile.peak_memory = tracemalloc.get_traced_memory()[1]
+    if started_here:
+        tracemalloc.stop()
+
+
+_original_render = DjangoBackendTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        profile.template_time += time.perf_counter() - started
+
+
+def install_template_timing():
+    """Time every render through the Django template backend (idempotent)."""
+    DjangoBackendTemplate.render = _timed_render
@@ -0,0 +1,136 @@
+"""Per-user practice progress, updated in the same transaction as each batch of answers."""
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .adaptive import update_ratings
+from .models import UserAnswer, UserProgress
+from .streaks import update_streaks
+
+# A validated answer that has not been written yet
+PendingAnswer = namedtuple('PendingAnswer', [
+    'user_id', 'question_id', 'subtopic_id', 'difficulty',
+    'option_id', 'is_correct', 'time_taken', 'answered_at',
+])
+
+
+def pending_answer(user, question, option, time_taken):
+    return PendingAnswer(
+        user_id=user.id,
+        question_id=question.id,
+        subtopic_id=question.subtopic_id,
+        difficulty=question.difficulty,
+        option_id=option.id,
+        is_correct=option.is_correct,
+        time_taken=time_taken,
+        answered_at=timezone.now(),
+    )
+
+
+def record_answers(pending):
+    """
+    Insert a batch of PendingAnswers and fold them into UserProgress, the
+    users' streaks and the adaptive ratings, all in one transaction.
+    Returns the created UserAnswer rows.
+    """
+    with transaction.atomic():
+        # Which (user, question) pairs were already attempted / answered correctly
+        history = (
+            UserAnswer.objects
+            .filter(user_id__in={p.user_id for p in pending}, question_id__in={p.question_id for p in pending})
+            .values('user_id', 'question_id')
+            .annotate(attempts=Count('id'), correct=Count('id', filter=Q(is_correct=True)))
+            .order_by()
+        )
+        seen = {
+            (row['user_id'], row['question_id']): [row['attempts'] > 0, row['correct'] > 0]
+            for row in history
+        }
+
+        answers = UserAnswer.objects.bulk_create([
+            UserAnswer(
+                user_id=p.user_id,
+                question_id=p.question_id,
+                option_id=p.option_id,
+                is_correct=p.is_correct,
+                time_taken=p.time_taken,
+                answered_at=p.answered_at,
+            )
+            for p in pending
+        ])
+
+        # Repeat attempts only add time, solved/correct count distinct questions
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for p in pending:
+            attempted, correct = seen.setdefault((p.user_id, p.question_id), [False, False])
+            delta = deltas[(p.user_id, p.subtopic_id, p.difficulty)]
+            if not attempted:
+                delta[0] += 1
+            if p.is_correct and not correct:
+                delta[1] += 1
+            delta[2] += p.time_taken
+            seen[(p.user_id, p.question_id)] = [True, correct or p.is_correct]
+
+        for (user_id, subtopic_id, difficulty), (solved, correct, time_taken) in deltas.items():
+            progress, _ = UserProgress.objects.get_or_create(
+                user_id=user_id,
+                subtopic_id=subtopic_id,
+                difficulty=difficulty
+            )
+            UserProgress.objects.filter(pk=progress.pk).update(
+                solved_count=F('solved_count') + solved,
+                correct_count=F('correct_count') + correct,
+                total_time=F('total_time') + time_taken,
+            )
+
+        update_streaks(pending)
+        update_ratings(pending)
+
+    return answers
+
+
+def get_progress(user, subtopic, difficulty):
+    """Return the user's progress row, or an unsaved empty one if they have not answered yet."""
+    progress = UserProgress.objects.filter(user=user, subtopic=subtopic, difficulty=difficulty).first()
+    if progress is None:
+        progress = UserProgress(user=user, subtopic=subtopic, difficulty=difficulty)
+    return progress
+
+
+def rebuild_progress(batch_size=1000):
+    """Recompute every UserProgress row from the full UserAnswer history. Returns the row count."""
+    rows = (
+        UserAnswer.objects
+        .values('user_id', 'question__subtopic_id', 'question__difficulty')
+        .annotate(
+            solved=Count('question', distinct=True),
+            correct=Count('question', filter=Q(is_correct=True), distinct=True),
+            total_time=Sum('time_taken'),
+        )
+        .order_by()
+    )
+
+    created = 0
+    with transaction.atomic():
+        UserProgress.objects.all().delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(UserProgress(
+                user_id=row['user_id'],
+                subtopic_id=row['question__subtopic_id'],
+                difficulty=row['question__difficulty'],
+                solved_count=row['solved'],
+                correct_count=row['correct'],
+                total_time=row['total_time'] or 0,
+            ))
+            if len(batch) >= batch_size:
+                UserProgress.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            UserProgress.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
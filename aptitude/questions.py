@@ -0,0 +1,79 @@
+"""
+Question edits for the boss screens. Options are updated in place, so the
+answers pointing at them survive an edit.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from .catalog import bump_catalog_version
+from .counters import adjust_question_counts
+from .models import Option
+
+
+def update_question(question, text, difficulty, time_limit, options):
+    """
+    Save a question and its options, given as ordered (text, is_correct) pairs.
+
+    Existing options are matched by position and only changed ones are
+    written; extra options are created and missing ones deleted.
+    """
+    with transaction.atomic():
+        question.text = text
+        question.difficulty = difficulty
+        question.time_limit = time_limit
+        question.save()
+
+        existing = list(Option.objects.select_for_update().filter(question=question).order_by('id'))
+        changed = []
+        for option, (option_text, is_correct) in zip(existing, options):
+            if option.text != option_text or option.is_correct != is_correct:
+                option.text = option_text
+                option.is_correct = is_correct
+                changed.append(option)
+        if changed:
+            Option.objects.bulk_update(changed, ['text', 'is_correct'])
+
+        if len(options) > len(existing):
+            Option.objects.bulk_create([
+                Option(question=question, text=option_text, is_correct=is_correct)
+                for option_text, is_correct in options[len(existing):]
+            ])
+        elif len(existing) > len(options):
+            Option.objects.filter(id__in=[option.id for option in existing[len(options):]]).delete()
+
+    return question
+
+
+def bulk_edit_questions(questions, difficulty=None, time_limit=None):
+    """
+    Set difficulty and/or time_limit on every question in a queryset with
+    set-based UPDATEs. Returns the number of questions matched.
+    """
+    deltas = {}
+    with transaction.atomic():
+        if difficulty is not None:
+            # No signals for update(), see aptitude/counters.py
+            moved = (
+                questions.exclude(difficulty=difficulty)
+                .values('subtopic_id', 'difficulty')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            for row in moved:
+                deltas[(row['subtopic_id'], row['difficulty'])] = -row['count']
+                key = (row['subtopic_id'], difficulty)
+                deltas[key] = deltas.get(key, 0) + row['count']
+
+        changes = {}
+        if difficulty is not None:
+            changes['difficulty'] = difficulty
+        if time_limit is not None:
+            changes['time_limit'] = time_limit
+        updated = questions.update(**changes) if changes else questions.count()
+
+        if deltas:
+            adjust_question_counts(deltas)
+
+    if deltas:
+        bump_catalog_version()
+    return updated
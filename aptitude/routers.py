@@ -0,0 +1,68 @@
+"""
+Primary/replica routing: reads go to the 'replica' alias when there is one,
+except after a write, inside transactions, and for sessions, auth and users.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+# A login must keep working once the pin cookie expires, even if the replica still lags
+PRIMARY_ONLY_APPS = {'sessions', 'auth'}
+
+_use_primary = ContextVar('use_primary', default=False)
+_has_written = ContextVar('has_written', default=False)
+
+
+def pin_to_primary():
+    """Send every read in the current context to the primary."""
+    _use_primary.set(True)
+
+
+def is_pinned():
+    return _use_primary.get()
+
+
+def has_written():
+    return _has_written.get()
+
+
+def start_request(pinned=False):
+    """Reset the routing state for a new request. Returns tokens for end_request()."""
+    return _use_primary.set(pinned), _has_written.set(False)
+
+
+def end_request(tokens):
+    pinned_token, written_token = tokens
+    _use_primary.reset(pinned_token)
+    _has_written.reset(written_token)
+
+
+class PrimaryReplicaRouter:
+    """Route reads to the replica and writes to the primary, with read-your-writes."""
+
+    def _has_replica(self):
+        return REPLICA_DB_ALIAS in settings.DATABASES
+
+    def _primary_only(self, model):
+        return model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.label == settings.AUTH_USER_MODEL
+
+    def db_for_read(self, model, **hints):
+        if not self._has_replica() or is_pinned() or self._primary_only(model):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        _has_written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,177 @@
+"""Deterministic synthetic data for load tests and benchmarks."""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .adaptive import rebuild_ratings
+from .analytics import rebuild_rollups
+from .catalog import bump_catalog_version
+from .counters import reconcile_counters
+from .models import Note, Option, Question, Resource, Subtopic, Topic, User, UserAnswer, VideoLesson
+from .progress import rebuild_progress
+from .streaks import backfill_streaks
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_PASSWORD = 'password123'
+
+# Chance of a correct answer and typical seconds taken, per difficulty
+ANSWER_PROFILES = {
+    'easy': (0.8, 30),
+    'medium': (0.6, 60),
+    'hard': (0.4, 90),
+}
+
+
+def _chunks(total, chunk_size):
+    for start in range(0, total, chunk_size):
+        yield range(start, min(start + chunk_size, total))
+
+
+def _create_users(report, prefix, students, bosses, password, chunk_size):
+    password = make_password(password)
+    users = [
+        User(username=f"{prefix}-boss{i}", email=f"{prefix}-boss{i}@example.com", password=password, role='boss')
+        for i in range(bosses)
+    ] + [
+        User(username=f"{prefix}-student{i}", email=f"{prefix}-student{i}@example.com", password=password, role='student')
+        for i in range(students)
+    ]
+    with transaction.atomic():
+        created = User.objects.bulk_create(users, batch_size=chunk_size)
+    report['users'] += len(created)
+    return [user.id for user in created if user.role == 'student']
+
+
+def _create_catalog(report, prefix, topics, subtopics, chunk_size):
+    categories = [choice for choice, _ in Topic.CATEGORY_CHOICES]
+    with transaction.atomic():
+        created_topics = Topic.objects.bulk_create([
+            Topic(name=f"{prefix} topic {i + 1}", category=categories[i % len(categories)], display_order=i + 1)
+            for i in range(topics)
+        ])
+    report['topics'] += len(created_topics)
+
+    subtopic_ids = []
+    for chunk in _chunks(subtopics, chunk_size):
+        with transaction.atomic():
+            created = Subtopic.objects.bulk_create([
+                Subtopic(
+                    topic=created_topics[i % topics],
+                    name=f"{prefix} subtopic {i + 1}",
+                    display_order=i // topics + 1,
+                )
+                for i in chunk
+            ])
+            VideoLesson.objects.bulk_create([
+                VideoLesson(subtopic=subtopic, title=f"{subtopic.name} lesson",
+                            video_url="https://example.com/video", duration=600)
+                for subtopic in created
+            ])
+            Note.objects.bulk_create([
+                Note(subtopic=subtopic, heading=f"{subtopic.name} notes", content="Worked examples.")
+                for subtopic in created
+            ])
+            Resource.objects.bulk_create([
+                Resource(subtopic=subtopic, description="Further reading", link="https://example.com/read")
+                for subtopic in created
+            ])
+        subtopic_ids.extend(subtopic.id for subtopic in created)
+        report['subtopics'] += len(created)
+    return subtopic_ids
+
+
+def _create_questions(report, rng, subtopic_ids, questions, chunk_size):
+    """Returns {question_id: (difficulty, correct_option_id, [wrong_option_ids])}."""
+    difficulties = list(ANSWER_PROFILES)
+    created_questions = {}
+    for chunk in _chunks(questions, chunk_size):
+        correct_positions = [rng.randrange(4) for _ in chunk]
+        with transaction.atomic():
+            created = Question.objects.bulk_create([
+                Question(
+                    subtopic_id=subtopic_ids[i % len(subtopic_ids)],
+                    difficulty=rng.choice(difficulties),
+                    text=f"Question {i + 1}",
+                    time_limit=rng.choice((30, 60, 90, 120)),
+                )
+                for i in chunk
+            ])
+            options = Option.objects.bulk_create([
+                Option(question=question, text=f"Option {j + 1}", is_correct=j == correct)
+                for question, correct in zip(created, correct_positions)
+                for j in range(4)
+            ])
+        for n, question in enumerate(created):
+            question_options = options[n * 4:n * 4 + 4]
+            correct = next(option.id for option in question_options if option.is_correct)
+            wrong = [option.id for option in question_options if not option.is_correct]
+            created_questions[question.id] = (question.difficulty, correct, wrong)
+        report['questions'] += len(created)
+        report['options'] += len(options)
+    return created_questions
+
+
+def _create_answers(report, rng, student_ids, questions, answers, days, end, chunk_size, progress):
+    question_ids = list(questions)
+    span = days * 24 * 60 * 60
+    for chunk in _chunks(answers, chunk_size):
+        batch = []
+        for _ in chunk:
+            question_id = rng.choice(question_ids)
+            difficulty, correct, wrong = questions[question_id]
+            accuracy, typical_time = ANSWER_PROFILES[difficulty]
+            is_correct = rng.random() < accuracy
+            batch.append(UserAnswer(
+                user_id=rng.choice(student_ids),
+                question_id=question_id,
+                option_id=correct if is_correct else rng.choice(wrong),
+                is_correct=is_correct,
+                time_taken=max(1, int(rng.gauss(typical_time, typical_time / 3))),
+                answered_at=end - datetime.timedelta(seconds=rng.randrange(span)),
+            ))
+        with transaction.atomic():
+            UserAnswer.objects.bulk_create(batch)
+        report['answers'] += len(batch)
+        if progress:
+            progress(report)
+
+
+def seed_dataset(topics=10, subtopics=100, questions=10000, students=100, answers=100000, bosses=1,
+                 days=30, seed=0, prefix=None, password=DEFAULT_PASSWORD, end=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, rebuild=True, progress=None):
+    """
+    Generate a synthetic dataset and return the number of rows created per model.
+
+    Users are named ``<prefix>-student<n>``/``<prefix>-boss<n>`` (prefix
+    defaults to ``seed<seed>``). Answers are spread over the ``days`` before
+    ``end``, which defaults to the start of today so the same seed gives the
+    same rows all day. ``progress`` is called with the counts after every
+    answer chunk.
+    """
+    if topics < 1 or subtopics < 1 or questions < 1 or (answers and students < 1):
+        raise ValueError("Need at least one topic, subtopic and question, and a student to answer")
+
+    rng = random.Random(seed)
+    prefix = prefix or f"seed{seed}"
+    if end is None:
+        end = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    report = dict.fromkeys(('users', 'topics', 'subtopics', 'questions', 'options', 'answers'), 0)
+
+    student_ids = _create_users(report, prefix, students, bosses, password, chunk_size)
+    subtopic_ids = _create_catalog(report, prefix, topics, subtopics, chunk_size)
+    created_questions = _create_questions(report, rng, subtopic_ids, questions, chunk_size)
+    if answers:
+        _create_answers(report, rng, student_ids, created_questions, answers, days, end, chunk_size, progress)
+
+    # No signals for bulk_create, see aptitude/counters.py
+    reconcile_counters()
+    bump_catalog_version()
+    if rebuild:
+        rebuild_progress()
+        backfill_streaks()
+        rebuild_rollups()
+        rebuild_ratings()
+    return report
@@ -5,11 +5,13 @@ class TopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = Topic
         fields = '__all__'
+        read_only_fields = Topic.COUNTER_FIELDS
 
 class SubtopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subtopic
         fields = '__all__'
+        read_only_fields = Subtopic.COUNTER_FIELDS
 
 class VideoLessonSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,6 +38,27 @@ class OptionSerializer(serializers.ModelSerializer):
         model = Option
         fields = '__all__'
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # Only bosses may see or set which option is correct
+        request = self.context.get('request')
+        if request is None or getattr(request.user, 'role', None) != 'boss':
+            fields.pop('is_correct')
+        return fields
+
+class PracticeOptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Option
+        fields = ['id', 'text']
+
+class PracticeQuestionSerializer(serializers.ModelSerializer):
+    # Read-only view for students, correctness flags are never exposed
+    options = PracticeOptionSerializer(source='option_set', many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'subtopic', 'difficulty', 'text', 'time_limit', 'options']
+
 
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -66,11 +89,16 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 class UserStreakSerializer(serializers.ModelSerializer):
+    current_streak = serializers.SerializerMethodField()
+
     class Meta:
         model = UserStreak
         fields = '__all__'
         read_only_fields = ['user']
 
+    def get_current_streak(self, obj):
+        return obj.current_streak()
+
 class NotificationSettingSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationSetting
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters
+from .catalog import bump_catalog_version
+from .lessons import invalidate_lesson
+from .models import Note, Question, Resource, Subtopic, Topic, User, VideoLesson
+
+
+@receiver([post_save, post_delete], sender=Subtopic)
+def invalidate_subtopic_lesson(sender, instance, **kwargs):
+    subtopic_id = instance.id
+    transaction.on_commit(lambda: invalidate_lesson(subtopic_id))
+
+
+@receiver([post_save, post_delete], sender=VideoLesson)
+@receiver([post_save, post_delete], sender=Note)
+@receiver([post_save, post_delete], sender=Resource)
+def invalidate_lesson_content(sender, instance, **kwargs):
+    subtopic_id = instance.subtopic_id
+    transaction.on_commit(lambda: invalidate_lesson(subtopic_id))
+
+
+# Fields each model's counters depend on
+COUNTED_FIELDS = {
+    Subtopic: ('topic_id',),
+    Question: ('subtopic_id', 'difficulty'),
+    User: ('role',),
+}
+
+
+@receiver(pre_save, sender=Subtopic)
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=User)
+def remember_counted_fields(sender, instance, update_fields=None, **kwargs):
+    """Stash the stored values of counted fields so post_save can move the counts."""
+    fields = COUNTED_FIELDS[sender]
+    instance._counted_before = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {field.removesuffix('_id') for field in fields} & set(update_fields):
+        return
+    instance._counted_before = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+def _counted_after(sender, instance):
+    return tuple(getattr(instance, field) for field in COUNTED_FIELDS[sender])
+
+
+@receiver(post_save, sender=Topic)
+def count_saved_topic(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_counter(counters.TOPICS, 1)
+
+
+@receiver(post_delete, sender=Topic)
+def count_deleted_topic(sender, instance, **kwargs):
+    counters.adjust_counter(counters.TOPICS, -1)
+
+
+@receiver(post_save, sender=Subtopic)
+def count_saved_subtopic(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, '_counted_before', None)
+    if not created and (before is None or before == _counted_after(sender, instance)):
+        return
+    if before is not None:
+        counters.adjust_subtopic_count(before[0], -1)
+    counters.adjust_subtopic_count(instance.topic_id, 1)
+
+
+@receiver(post_delete, sender=Subtopic)
+def count_deleted_subtopic(sender, instance, **kwargs):
+    counters.adjust_subtopic_count(instance.topic_id, -1)
+
+
+@receiver(post_save, sender=Question)
+def count_saved_question(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, '_counted_before', None)
+    after = _counted_after(sender, instance)
+    if not created and (before is None or before == after):
+        return
+    deltas = {after: 1}
+    if before is not None:
+        deltas[before] = -1
+    counters.adjust_question_counts(deltas)
+
+
+@receiver(post_delete, sender=Question)
+def count_deleted_question(sender, instance, **kwargs):
+    counters.adjust_question_counts({_counted_after(sender, instance): -1})
+
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, **kwargs):
+    before = None if created else getattr(instance, '_counted_before', None)
+    if not created and before is None:
+        return
+    was_student = before is not None and before[0] == 'student'
+    counters.adjust_counter(counters.STUDENTS, (instance.role == 'student') - was_student)
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    if instance.role == 'student':
+        counters.adjust_counter(counters.STUDENTS, -1)
+
+
+@receiver([post_save, post_delete], sender=Topic)
+@receiver([post_save, post_delete], sender=Subtopic)
+@receiver([post_save, post_delete], sender=Question)
+@receiver([post_save, post_delete], sender=VideoLesson)
+@receiver([post_save, post_delete], sender=Note)
+@receiver([post_save, post_delete], sender=Resource)
+def invalidate_catalog(sender, **kwargs):
+    # After commit, or a concurrent reader could cache pre-commit rows under the new version.
+    # Connected after the counter receivers: in autocommit on_commit runs at once, and the
+    # bump must not come before the counts it publishes.
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
@@ -0,0 +1,81 @@
+"""Daily answer streaks: one UserStreak row per user, advanced by record_answers()."""
+import datetime
+
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import UserAnswer, UserStreak
+
+ONE_DAY = datetime.timedelta(days=1)
+
+
+def advance_streak(streak, day):
+    """Fold an answer on ``day`` into a streak. Days already counted are ignored."""
+    if streak.date is None or day > streak.date:
+        if streak.date is not None and day - streak.date == ONE_DAY:
+            streak.streak_count += 1
+        else:
+            streak.streak_count = 1
+        streak.date = day
+        streak.longest_streak = max(streak.longest_streak, streak.streak_count)
+        return True
+    return False
+
+
+def update_streaks(pending):
+    """Advance the streaks of the users in a batch of PendingAnswers."""
+    days_by_user = {}
+    for answer in pending:
+        days_by_user.setdefault(answer.user_id, set()).add(timezone.localdate(answer.answered_at))
+
+    streaks = {
+        streak.user_id: streak
+        for streak in UserStreak.objects.select_for_update().filter(user_id__in=days_by_user)
+    }
+    created, changed = [], []
+    for user_id, days in days_by_user.items():
+        streak = streaks.get(user_id)
+        if streak is None:
+            streak = UserStreak(user_id=user_id, date=None, streak_count=0)
+            created.append(streak)
+        advanced = [advance_streak(streak, day) for day in sorted(days)]
+        if any(advanced) and streak.pk is not None:
+            changed.append(streak)
+
+    if created:
+        UserStreak.objects.bulk_create(created)
+    if changed:
+        UserStreak.objects.bulk_update(changed, ['date', 'streak_count', 'longest_streak'])
+
+
+def backfill_streaks(chunk_size=2000):
+    """Recompute every UserStreak row from the full UserAnswer history. Returns the row count."""
+    active_days = (
+        UserAnswer.objects
+        .annotate(day=TruncDate('answered_at'))
+        .values_list('user_id', 'day')
+        .distinct()
+        .order_by('user_id', 'day')
+    )
+
+    created = 0
+    with transaction.atomic():
+        UserStreak.objects.all().delete()
+        batch = []
+        streak = None
+        for user_id, day in active_days.iterator(chunk_size=chunk_size):
+            if streak is None or streak.user_id != user_id:
+                streak = UserStreak(user_id=user_id, date=None, streak_count=0)
+                batch.append(streak)
+            advance_streak(streak, day)
+            # The last streak may still be advancing, so only flush the finished ones
+            if len(batch) > chunk_size:
+                UserStreak.objects.bulk_create(batch[:-1])
+                created += len(batch) - 1
+                batch = batch[-1:]
+        if batch:
+            UserStreak.objects.bulk_create(batch)
+            created += len(batch)
+
+    return created
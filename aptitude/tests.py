@@ -1,3 +1,1491 @@
-from django.test import TestCase
+import datetime
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import adaptive, metrics
+from .analytics import percentile, rebuild_rollups, refresh_rollups
+from .catalog import get_catalog, get_catalog_version, question_page
+from .counters import get_site_counters
+from .importers import import_questions
+from .ingest import AnswerBuffer
+from .lessons import get_lesson_bundle
+from .middleware import PRIMARY_PIN_COOKIE, RequestProfilingMiddleware
+from .models import *
+from .ordering import append_subtopic, append_topic, reorder_subtopics, reorder_topics
+from .progress import PendingAnswer, pending_answer, record_answers
+from .questions import bulk_edit_questions, update_question
+from .routers import REPLICA_DB_ALIAS, PrimaryReplicaRouter, end_request, start_request
+from .seeding import seed_dataset
+from .streaks import advance_streak, backfill_streaks
+
+
+def create_subtopic(name="Primes", topic=None):
+    """A subtopic, in a new "Numbers" topic unless one is given."""
+    if topic is None:
+        topic = Topic.objects.create(name="Numbers", category='Common', display_order=1)
+    return Subtopic.objects.create(topic=topic, name=name, display_order=topic.subtopic_set.count() + 1)
+
+
+def create_question(subtopic, difficulty='easy', text="2+2", options=(("4", True),), time_limit=30):
+    """A question with its options, given as (text, is_correct) pairs."""
+    question = Question.objects.create(subtopic=subtopic, difficulty=difficulty, text=text, time_limit=time_limit)
+    for option_text, is_correct in options:
+        Option.objects.create(question=question, text=option_text, is_correct=is_correct)
+    return question
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryIndexTests(TestCase):
+    """The hot query shapes must be answered from an index, never a full table scan."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        table = queryset.model._meta.db_table
+        for line in plan.splitlines():
+            if f"SCAN {table}" in line:
+                self.assertIn("USING", line, plan)
+
+    def test_questions_by_subtopic_and_difficulty(self):
+        queryset = Question.objects.filter(subtopic_id=1, difficulty='easy').order_by('id')
+        self.assertUsesIndex(queryset, 'question_subtopic_diff_idx')
+        self.assertNotIn("TEMP B-TREE", queryset.explain())
+
+    def test_answers_by_user_and_question(self):
+        queryset = UserAnswer.objects.filter(user_id=1, question_id=1)
+        self.assertUsesIndex(queryset, 'useranswer_user_question_idx')
+
+    def test_topics_by_category(self):
+        queryset = Topic.objects.filter(category='Common').order_by('display_order')
+        self.assertUsesIndex(queryset, 'topic_category_order_idx')
+        self.assertNotIn("TEMP B-TREE", queryset.explain())
+
+    def test_subtopics_by_topic(self):
+        queryset = Subtopic.objects.filter(topic_id=1).order_by('display_order')
+        self.assertUsesIndex(queryset, 'subtopic_topic_order_idx')
+        self.assertNotIn("TEMP B-TREE", queryset.explain())
+
+
+@skipUnless(connection.vendor == 'sqlite', "Exercises the SQLite locking settings")
+class SQLiteConcurrencyTests(TransactionTestCase):
+    """Concurrent answer writes must wait for the write lock, not fail with 'database is locked'."""
+
+    THREADS = 8
+    WRITES_PER_THREAD = 25
+
+    def setUp(self):
+        self.question = create_question(create_subtopic())
+        self.option = self.question.option_set.get()
+        self.users = [
+            User.objects.create_user(username=f"student{i}", email=f"student{i}@example.com", password="x")
+            for i in range(2)
+        ]
+
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_concurrent_answer_inserts(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def write_answers(user):
+            try:
+                barrier.wait()
+                for _ in range(self.WRITES_PER_THREAD):
+                    record_answers([PendingAnswer(
+                        user_id=user.id,
+                        question_id=self.question.id,
+                        subtopic_id=self.question.subtopic_id,
+                        difficulty=self.question.difficulty,
+                        option_id=self.option.id,
+                        is_correct=True,
+                        time_taken=1,
+                        answered_at=timezone.now(),
+                    )])
+            except OperationalError as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=write_answers, args=(self.users[i % len(self.users)],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(UserAnswer.objects.count(), self.THREADS * self.WRITES_PER_THREAD)
+        for user in self.users:
+            progress = UserProgress.objects.get(user=user)
+            self.assertEqual(progress.solved_count, 1)
+            self.assertEqual(progress.total_time, self.THREADS // len(self.users) * self.WRITES_PER_THREAD)
+
+
+# Dataset sizes for the view benchmarks, picked with APTITUDE_BENCH_SCALE
+BENCH_SCALES = {
+    'small': {'topics': 3, 'subtopics': 6, 'questions': 180, 'students': 5, 'answers': 600},
+    'large': {'topics': 50, 'subtopics': 2000, 'questions': 200000, 'students': 500, 'answers': 1000000},
+}
+
+
+def use_temp_metrics_dir(test, **overrides):
+    """Enable metrics for one test, writing to a directory of its own rather than the shared default."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    settings_override = override_settings(METRICS={'ENABLED': True, 'DIR': directory.name, **overrides})
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    return directory.name
+
+
+@override_settings(ANSWER_INGEST={'ASYNC': False})
+class ViewBenchmarkTests(TestCase):
+    """
+    Query budgets and latency for every view in aptitude_prep/urls.py and aptitude/urls.py.
+
+    Each case runs APTITUDE_BENCH_REPEAT times against a freshly cleared
+    cache, so the budget covers the cold path. A case fails when any run
+    issues more queries than QUERY_BUDGETS allows. With
+    APTITUDE_BENCH_BASELINE pointing at a JSON file written earlier through
+    APTITUDE_BENCH_OUTPUT, a case also fails when its query count rises or
+    its p95 latency exceeds the baseline by more than
+    APTITUDE_BENCH_TOLERANCE. The Django admin is not covered.
+    """
+
+    # Maximum queries per request on a cold cache, including session and user lookups
+    QUERY_BUDGETS = {
+        'analytics': 4,
+        'api_lessons': 1,
+        'api_me': 0,
+        'api_notes': 1,
+        'api_notifications': 1,
+        'api_options': 1,
+        'api_practice_set': 2,
+        'api_questions': 1,
+        'api_register': 4,
+        'api_resources': 1,
+        'api_streaks': 1,
+        'api_subtopics': 1,
+        'api_token': 1,
+        'api_topics': 1,
+        'boss_dashboard': 5,
+        'contests': 2,
+        'export_answers': 3,
+        'export_questions': 4,
+        'home': 9,
+        'login': 0,
+        'login_post': 9,
+        'logout': 4,
+        'metrics': 0,
+        'note_content': 3,
+        'practice': 9,
+        'practice_adaptive': 10,
+        'practice_new': 10,
+        # A first answer for the subtopic/difficulty also creates the progress and rating rows
+        'practice_new_post': 21,
+        'practice_post': 21,
+        'question_bulk_edit': 6,
+        'question_import': 9,
+        'question_page': 5,
+        'question_phase': 6,
+        'signup': 0,
+        'signup_post': 12,
+        'subtopic_phase': 4,
+        'subtopic_reorder': 8,
+        'subtopics': 9,
+        'topic_reorder': 11,
+        'video_lesson': 11,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        scale = BENCH_SCALES[os.environ.get('APTITUDE_BENCH_SCALE', 'small')]
+        seed_dataset(password="bench-password", **scale)
+        cls.boss = User.objects.filter(role='boss').order_by('id').first()
+        cls.student = User.objects.filter(role='student').order_by('id').first()
+        cls.topic = Topic.objects.order_by('id').first()
+        cls.subtopic = Subtopic.objects.filter(topic=cls.topic).order_by('id').first()
+        cls.note = Note.objects.filter(subtopic=cls.subtopic).first()
+        cls.question = Question.objects.filter(subtopic=cls.subtopic, difficulty='easy').order_by('id').first()
+        cls.option = cls.question.option_set.order_by('id').first()
+        NotificationSetting.objects.create(user=cls.student, reminder_time=datetime.time(9))
+
+    def setUp(self):
+        cache.clear()
+        use_temp_metrics_dir(self)
+        self.repeat = int(os.environ.get('APTITUDE_BENCH_REPEAT', 5))
+        self.results = {}
+
+    def _clients(self):
+        anonymous = APIClient()
+        student = APIClient()
+        student.force_login(self.student)
+        student.force_authenticate(self.student)
+        boss = APIClient()
+        boss.force_login(self.boss)
+        return {'anonymous': anonymous, 'student': student, 'boss': boss}
+
+    def _cases(self):
+        subtopic, topic, question = self.subtopic, self.topic, self.question
+        practice_args = {'subtopic_id': subtopic.id, 'difficulty': 'easy', 'q_index': 0}
+        subtopic_ids = list(Subtopic.objects.filter(topic=topic).order_by('display_order').values_list('id', flat=True))
+        topic_ids = list(Topic.objects.order_by('display_order').values_list('id', flat=True))
+        question_csv = (
+            "subtopic_id,difficulty,text,time_limit,option1,option2,option3,option4,correct_option\n"
+            f"{subtopic.id},easy,Imported,60,a,b,c,d,1\n"
+        )
+
+        # (name, client, method, url, data)
+        return [
+            ('login', 'anonymous', 'get', reverse('login'), None),
+            ('login_post', 'anonymous', 'post', reverse('login'), {'email': self.student.email, 'password': "bench-password"}),
+            ('signup', 'anonymous', 'get', reverse('signup'), None),
+            ('signup_post', 'anonymous', 'post', reverse('signup'), lambda run: {
+                'username': f"new{run}", 'email': f"new{run}@example.com", 'password': "bench-password",
+            }),
+            ('logout', 'student', 'get', reverse('logout_view'), None),
+            ('home', 'student', 'get', reverse('home'), None),
+            ('analytics', 'student', 'get', reverse('analytics'), None),
+            ('contests', 'student', 'get', reverse('contests'), None),
+            ('subtopics', 'student', 'get', reverse('subtopics', args=[topic.id]), None),
+            ('video_lesson', 'student', 'get', reverse('video_lesson', args=[subtopic.id]), None),
+            ('note_content', 'student', 'get', reverse('note_content', args=[self.note.id]), None),
+            ('practice', 'student', 'get', reverse('practice', kwargs=practice_args), None),
+            ('practice_post', 'student', 'post', reverse('practice', kwargs=practice_args),
+             {'option_id': self.option.id, 'time_taken': 10}),
+            ('practice_new', 'student', 'get', reverse('practice_new', kwargs=practice_args), None),
+            ('practice_new_post', 'student', 'post', reverse('practice_new', kwargs=practice_args),
+             {'option_id': self.option.id, 'time_taken': 10}),
+            ('practice_adaptive', 'student', 'get', reverse('practice_adaptive', args=[subtopic.id]), None),
+            ('boss_dashboard', 'boss', 'get', reverse('boss_dashboard'), None),
+            ('topic_reorder', 'boss', 'post', reverse('topic_reorder'), {'order': topic_ids}),
+            ('subtopic_phase', 'boss', 'get', reverse('subtopic_phase', args=[topic.id]), None),
+            ('subtopic_reorder', 'boss', 'post', reverse('subtopic_reorder', args=[topic.id]), {'order': subtopic_ids}),
+            ('question_phase', 'boss', 'get', reverse('question_phase', args=[subtopic.id]), None),
+            ('question_page', 'boss', 'get', reverse('question_page', args=[subtopic.id]) + f"?after={question.id}", None),
+            ('question_bulk_edit', 'boss', 'post', reverse('question_bulk_edit', args=[subtopic.id]),
+             {'question_ids': [question.id], 'time_limit': 45}),
+            ('question_import', 'boss', 'post', reverse('question_import'), lambda run: {
+                'file': SimpleUploadedFile("questions.csv", question_csv.encode()),
+            }),
+            ('export_questions', 'boss', 'get', reverse('export', args=['questions']) + f"?subtopic={subtopic.id}", None),
+            ('export_answers', 'boss', 'get', reverse('export', args=['answers']) + f"?subtopic={subtopic.id}", None),
+            ('api_token', 'anonymous', 'post', reverse('token_obtain_pair'), {'email': self.student.email, 'password': "bench-password"}),
+            ('api_register', 'anonymous', 'post', reverse('register'), lambda run: {
+                'username': f"api{run}", 'email': f"api{run}@example.com", 'password': "bench-password", 'role': 'student',
+            }),
+            ('api_me', 'student', 'get', reverse('me'), None),
+            ('api_topics', 'student', 'get', reverse('topic-list'), None),
+            ('api_subtopics', 'student', 'get', reverse('subtopic-list') + f"?topic={topic.id}", None),
+            ('api_lessons', 'student', 'get', reverse('videolesson-list'), None),
+            ('api_notes', 'student', 'get', reverse('note-list'), None),
+            ('api_resources', 'student', 'get', reverse('resource-list'), None),
+            ('api_questions', 'student', 'get', reverse('question-list') + f"?subtopic={subtopic.id}", None),
+            ('api_options', 'student', 'get', reverse('option-list') + f"?question={question.id}", None),
+            ('api_streaks', 'student', 'get', reverse('streak-list'), None),
+            ('api_notifications', 'student', 'get', reverse('notification-list'), None),
+            ('api_practice_set', 'student', 'get', reverse('practice_set', args=[subtopic.id, 'easy']), None),
+            ('metrics', 'anonymous', 'get', reverse('metrics'), None),
+        ]
+
+    def _run_case(self, client, method, url, data, run):
+        if callable(data):
+            data = data(run)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 400, f"{method.upper()} {url}")
+        return len(queries), elapsed * 1000
+
+    def _load_baseline(self):
+        path = os.environ.get('APTITUDE_BENCH_BASELINE')
+        if not path:
+            return {}
+        with open(path) as baseline:
+            return json.load(baseline)
+
+    def test_view_budgets(self):
+        baseline = self._load_baseline()
+        tolerance = float(os.environ.get('APTITUDE_BENCH_TOLERANCE', 1.5))
+
+        for name, client_name, method, url, data in self._cases():
+            with self.subTest(view=name):
+                cache.clear()
+                query_counts, timings = [], []
+                for run in range(self.repeat):
+                    # Fresh clients so logins, logouts and signups start from the same state
+                    client = self._clients()[client_name]
+                    queries, elapsed = self._run_case(client, method, url, data, run)
+                    query_counts.append(queries)
+                    timings.append(elapsed)
+
+                timings.sort()
+                result = self.results[name] = {
+                    'queries': max(query_counts),
+                    'p50_ms': round(percentile(timings, 50), 2),
+                    'p95_ms': round(percentile(timings, 95), 2),
+                }
+
+                self.assertIn(name, self.QUERY_BUDGETS, f"No query budget for {name}: {result}")
+                self.assertLessEqual(result['queries'], self.QUERY_BUDGETS[name], f"{name} is over its query budget")
+                if name in baseline:
+                    self.assertLessEqual(result['queries'], baseline[name]['queries'], f"{name} issues more queries than the baseline")
+                    self.assertLessEqual(
+                        result['p95_ms'], baseline[name]['p95_ms'] * tolerance,
+                        f"{name} p95 {result['p95_ms']}ms regressed past the baseline {baseline[name]['p95_ms']}ms"
+                    )
+
+        output = os.environ.get('APTITUDE_BENCH_OUTPUT')
+        if output:
+            with open(output, 'w') as results:
+                json.dump(self.results, results, indent=2, sort_keys=True)
+
+
+@override_settings(ANSWER_INGEST={'ASYNC': False})
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="m", email="m@example.com", password="pw", role='student')
+        cls.subtopic = create_subtopic()
+        cls.question = create_question(cls.subtopic)
+        cls.option = cls.question.option_set.get()
+
+    def setUp(self):
+        self.directory = use_temp_metrics_dir(self, FLUSH_INTERVAL=0)
+        metrics.registry.values.clear()
+        cache.clear()
+
+    def _scrape(self, **extra):
+        response = self.client.get(reverse('metrics'), **extra)
+        return response, response.content.decode()
+
+    def test_records_answers_views_auth_and_cache(self):
+        self.client.post(reverse('login'), {'email': self.student.email, 'password': "pw"})
+        url = reverse('practice', kwargs={'subtopic_id': self.subtopic.id, 'difficulty': 'easy', 'q_index': 0})
+        self.client.post(url, {'option_id': self.option.id, 'time_taken': 5})
+        self.client.get(reverse('home'))
+
+        response, body = self._scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith("text/plain; version=0.0.4"))
+        self.assertIn('aptitude_answers_submitted_total{difficulty="easy",correct="true"} 1', body)
+        self.assertIn('aptitude_auth_seconds_count{result="success"} 1', body)
+        self.assertIn('aptitude_view_seconds_count{view="practice",method="POST"} 1', body)
+        self.assertIn('aptitude_view_queries_bucket{view="practice",le="+Inf"} 1', body)
+        self.assertIn('aptitude_cache_requests_total{cache="catalog",result="miss"}', body)
+
+    def test_merges_files_from_other_processes(self):
+        metrics.answers_submitted.inc(difficulty='hard', correct='false')
+        metrics.auth_latency.observe(0.02, result='failure')
+        with open(os.path.join(self.directory, "99999.json"), 'w') as other:
+            json.dump({
+                'aptitude_answers_submitted_total': [[['hard', 'false'], 2]],
+                'aptitude_auth_seconds': [[['failure'], {'buckets': [0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 1], 'sum': 0.02, 'count': 1}]],
+            }, other)
+
+        _, body = self._scrape()
+        self.assertIn('aptitude_answers_submitted_total{difficulty="hard",correct="false"} 3', body)
+        self.assertIn('aptitude_auth_seconds_bucket{result="failure",le="0.025"} 2', body)
+        self.assertIn('aptitude_auth_seconds_bucket{result="failure",le="0.01"} 0', body)
+        self.assertIn('aptitude_auth_seconds_count{result="failure"} 2', body)
+
+    def test_concurrent_flushes(self):
+        errors = []
+
+        def record():
+            try:
+                for _ in range(50):
+                    metrics.answers_submitted.inc(difficulty='easy', correct='true')
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        _, body = self._scrape()
+        self.assertIn('aptitude_answers_submitted_total{difficulty="easy",correct="true"} 400', body)
+
+    def test_write_errors_are_logged_not_raised(self):
+        blocker = os.path.join(self.directory, "not-a-directory")
+        open(blocker, 'w').close()
+        with override_settings(METRICS={'ENABLED': True, 'DIR': blocker, 'FLUSH_INTERVAL': 0}), \
+                self.assertLogs('aptitude.metrics', 'ERROR'):
+            metrics.answers_submitted.inc(difficulty='easy', correct='true')
+
+    def test_external_addresses_are_refused(self):
+        response, _ = self._scrape(REMOTE_ADDR="203.0.113.9")
+        self.assertEqual(response.status_code, 404)
+
+    def test_disabled_by_default(self):
+        with override_settings(METRICS={'DIR': self.directory}):
+            metrics.answers_submitted.inc(difficulty='easy', correct='true')
+            response, _ = self._scrape()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(metrics.registry.values, {})
+
+    def test_token_is_required_when_set(self):
+        with override_settings(METRICS={'ENABLED': True, 'DIR': self.directory, 'TOKEN': "s3cret"}):
+            self.assertEqual(self._scrape()[0].status_code, 404)
+            self.assertEqual(self._scrape(HTTP_AUTHORIZATION="Bearer wrong")[0].status_code, 404)
+            response, _ = self._scrape(REMOTE_ADDR="203.0.113.9", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+
+class RequestProfilingTests(TestCase):
+    SERVER_TIMING = re.compile(
+        r'^total;dur=\d+\.\d, sql;dur=\d+\.\d;desc="(\d+) queries", tpl;dur=\d+\.\d, py;dur=\d+\.\d$'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.topic = Topic.objects.create(name="Numbers", category='Common', display_order=1)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_file = os.path.join(directory.name, "profile.jsonl")
+
+    def _profile(self, view, **overrides):
+        """Run view through the middleware; returns (response, logged records)."""
+        profiling_settings = {'ENABLED': True, 'SAMPLE_RATE': 1.0, 'LOG_FILE': self.log_file, **overrides}
+        with override_settings(REQUEST_PROFILING=profiling_settings):
+            response = RequestProfilingMiddleware(view)(RequestFactory().get("/profiled/"))
+        if not os.path.exists(self.log_file):
+            return response, []
+        with open(self.log_file) as log:
+            return response, [json.loads(line) for line in log]
+
+    def test_server_timing_header_and_log_line(self):
+        def view(request):
+            list(Topic.objects.all())
+            return HttpResponse("ok")
+
+        response, records = self._profile(view)
+        match = self.SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertEqual(match.group(1), "1")
+        self.assertEqual(len(records), 1)
+        record = records[0]
+        self.assertEqual((record['method'], record['path'], record['status']), ("GET", "/profiled/", 200))
+        self.assertEqual(record['sql_count'], 1)
+        self.assertEqual(record['duplicate_queries'], [])
+        self.assertIsNone(record['peak_memory_kb'])
+        self.assertGreaterEqual(record['total_ms'], record['sql_ms'])
+
+    def test_repeated_queries_are_flagged(self):
+        topics = [Topic.objects.create(name=f"T{i}", category='Common', display_order=i + 2) for i in range(4)]
+
+        def view(request):
+            for topic in topics:
+                Topic.objects.get(pk=topic.pk)
+            return HttpResponse("ok")
+
+        _, records = self._profile(view)
+        duplicates = records[0]['duplicate_queries']
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0]['count'], 4)
+        self.assertIn('WHERE "aptitude_topic"."id" = %s', duplicates[0]['sql'])
+
+    def test_unsampled_requests_are_not_profiled(self):
+        response, records = self._profile(lambda request: HttpResponse("ok"), SAMPLE_RATE=0)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(records, [])
+
+    def test_peak_memory_only_with_tracemalloc(self):
+        def view(request):
+            return HttpResponse("x" * 100_000)
+
+        _, records = self._profile(view, TRACEMALLOC=True)
+        self.assertGreater(records[0]['peak_memory_kb'], 0)
+        _, records = self._profile(view)
+        self.assertIsNone(records[1]['peak_memory_kb'])
+
+
+@override_settings(ANSWER_INGEST={'ASYNC': False})
+class AdaptivePracticeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="a", email="a@example.com", password="pw", role='student')
+        cls.subtopic = create_subtopic()
+        cls.questions = {
+            difficulty: create_question(cls.subtopic, difficulty, difficulty, [("right", True), ("wrong", False)])
+            for difficulty in ('easy', 'medium', 'hard')
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+        self.url = reverse('practice_adaptive', args=[self.subtopic.id])
+
+    def _answer(self, question, correct):
+        option = question.option_set.get(is_correct=correct)
+        record_answers([PendingAnswer(
+            user_id=self.student.id, question_id=question.id, subtopic_id=self.subtopic.id,
+            difficulty=question.difficulty, option_id=option.id, is_correct=correct,
+            time_taken=5, answered_at=timezone.now(),
+        )])
+
+    def test_answers_update_ratings_incrementally(self):
+        easy = self.questions['easy']
+        self._answer(easy, True)
+        user_rating = UserSubtopicRating.objects.get(user=self.student, subtopic=self.subtopic)
+        question_rating = QuestionRating.objects.get(question=easy)
+        self.assertGreater(user_rating.rating, adaptive.INITIAL_USER_RATING)
+        self.assertLess(question_rating.rating, adaptive.INITIAL_QUESTION_RATINGS['easy'])
+        self.assertEqual(adaptive.get_user_rating(self.student.id, self.subtopic.id), user_rating.rating)
+
+        self._answer(easy, False)
+        incremental = UserSubtopicRating.objects.get(pk=user_rating.pk).rating
+        self.assertEqual(adaptive.rebuild_ratings(), (1, 1))
+        self.assertAlmostEqual(UserSubtopicRating.objects.get(user=self.student).rating, incremental)
+
+    def test_pick_question_takes_nearest_unanswered(self):
+        ratings, ids = [1300.0, 1500.0, 1700.0], [1, 2, 3]
+        self.assertEqual(adaptive.pick_question(ratings, ids, 1450), 2)
+        self.assertEqual(adaptive.pick_question(ratings, ids, 1450, exclude={2}), 1)
+        self.assertEqual(adaptive.pick_question(ratings, ids, 1650, exclude={2, 3}), 1)
+        self.assertIsNone(adaptive.pick_question(ratings, ids, 1500, exclude={1, 2, 3}))
+
+    def test_selection_uses_cached_tables(self):
+        adaptive.get_question_table(self.subtopic.id)
+        adaptive.get_user_rating(self.student.id, self.subtopic.id)
+        with self.assertNumQueries(0):
+            adaptive.next_question_id(self.student.id, self.subtopic.id)
+
+    def test_session_follows_the_rating_and_completes(self):
+        # A new student is aimed just below their rating, at the easy question
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['question'], self.questions['easy'])
+
+        # A strong student skips straight to the hard question
+        UserSubtopicRating.objects.create(user=self.student, subtopic=self.subtopic, rating=1900)
+        cache.clear()
+        response = self.client.get(self.url + "?restart")
+        self.assertEqual(response.context['question'], self.questions['hard'])
+
+        served = []
+        for _ in range(3):
+            question = self.client.get(self.url).context['question']
+            served.append(question.id)
+            option = question.option_set.get(is_correct=True)
+            self.assertRedirects(self.client.post(self.url, {'option_id': option.id, 'time_taken': 4}), self.url)
+        self.assertCountEqual(served, [question.id for question in self.questions.values()])
+        self.assertEqual(UserAnswer.objects.filter(user=self.student).count(), 3)
+        self.assertContains(self.client.get(self.url), "completed all questions")
+
+
+class PracticeSessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="p", email="p@example.com", password="pw", role='student')
+        first = create_subtopic("Subtopic 0")
+        cls.subtopics = [first, create_subtopic("Subtopic 1", first.topic)]
+        for subtopic in cls.subtopics:
+            for n in range(2):
+                create_question(subtopic, text=f"Q{n}", options=[("a", True)])
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def _practice(self, subtopic, q_index):
+        return self.client.get(reverse('practice', args=[subtopic.id, 'easy', q_index]))
+
+    def test_only_the_current_session_is_kept(self):
+        first, second = self.subtopics
+        self._practice(first, 0)
+        self._practice(second, 0)
+        self._practice(first, 0)
+
+        keys = [key for key in self.client.session.keys() if key.startswith("practice:")]
+        self.assertEqual(keys, ["practice:current"])
+        expected = list(Question.objects.filter(subtopic=first).order_by('id').values_list('id', flat=True))
+        self.assertEqual(self.client.session["practice:current"]['ids'], expected)
+        self.assertEqual(self._practice(first, 1).context['question'].id, expected[1])
+
+    def test_progress_includes_the_answer_just_posted(self):
+        subtopic = self.subtopics[0]
+        question = Question.objects.filter(subtopic=subtopic).order_by('id').first()
+        url = reverse('practice_new', args=[subtopic.id, 'easy', 0])
+        self.client.post(url, {'option_id': question.option_set.get().id, 'time_taken': 3})
+        response = self.client.get(reverse('practice_new', args=[subtopic.id, 'easy', 1]))
+        self.assertEqual(response.context['solved_count'], 1)
+
+    def test_switching_subtopic_mid_session_resolves_its_list(self):
+        first, second = self.subtopics
+        self._practice(first, 0)
+        response = self._practice(second, 1)
+        expected = Question.objects.filter(subtopic=second).order_by('id')[1]
+        self.assertEqual(response.context['question'], expected)
+
+
+class AnalyticsRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(topics=2, subtopics=4, questions=40, students=6, answers=900, days=5, rebuild=False)
+
+    def _expected(self):
+        groups = {}
+        answers = UserAnswer.objects.values_list(
+            'user_id', 'answered_at', 'question__subtopic__topic_id', 'question__difficulty', 'is_correct', 'time_taken',
+        )
+        for user_id, answered_at, topic_id, difficulty, is_correct, time_taken in answers:
+            groups.setdefault((user_id, timezone.localdate(answered_at), topic_id, difficulty), []).append(
+                (is_correct, time_taken)
+            )
+        expected = {}
+        for key, rows in groups.items():
+            times = sorted(time_taken for _, time_taken in rows)
+            expected[key] = (
+                len(rows), sum(1 for is_correct, _ in rows if is_correct), sum(times),
+                percentile(times, 50), percentile(times, 90),
+            )
+        return expected
+
+    def _actual(self):
+        return {
+            (row.user_id, row.date, row.topic_id, row.difficulty):
+                (row.attempts, row.correct_count, row.total_time, row.time_p50, row.time_p90)
+            for row in DailyAnswerRollup.objects.all()
+        }
+
+    def test_rebuild_matches_answer_history(self):
+        rebuilt = rebuild_rollups(users_per_chunk=4)
+        self.assertEqual(self._actual(), self._expected())
+        self.assertEqual(rebuilt, len({key[:2] for key in self._expected()}))
+        checkpoint = RollupCheckpoint.objects.get(name='daily_answers')
+        self.assertEqual(checkpoint.last_answer_id, UserAnswer.objects.order_by('-id').first().id)
+
+    def test_chunked_refresh_folds_in_new_answers(self):
+        rebuild_rollups()
+        student = User.objects.filter(role='student').first()
+        question = Question.objects.first()
+        option = question.option_set.first()
+        record_answers([
+            PendingAnswer(student.id, question.id, question.subtopic_id, question.difficulty,
+                          option.id, option.is_correct, seconds, timezone.now())
+            for seconds in (5, 15, 25)
+        ])
+
+        # Three answers in chunks of two rebuild the same user-day twice
+        self.assertEqual(refresh_rollups(chunk_size=2), 2)
+        self.assertEqual(self._actual(), self._expected())
+        self.assertEqual(refresh_rollups(), 0)
+
+    def test_refresh_from_scratch_in_small_chunks(self):
+        refresh_rollups(chunk_size=50)
+        self.assertEqual(self._actual(), self._expected())
+
+
+class QuestionImportTests(TestCase):
+    HEADER = "subtopic_id,difficulty,text,time_limit,option1,option2,option3,option4,correct_option\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        cls.subtopic = create_subtopic()
+
+    def _csv(self, *rows):
+        return io.BytesIO((self.HEADER + "".join(rows)).encode())
+
+    def test_rows_are_written_in_batches_and_counted(self):
+        rows = [f"{self.subtopic.id},{level},Q{i},30,a,b,c,d,2\n" for i, level in enumerate(['easy'] * 3 + ['hard'] * 2)]
+        batches = []
+        report = import_questions(self._csv(*rows), 'csv', batch_size=2, progress=lambda r: batches.append(r.created))
+
+        self.assertEqual(report.created, 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.subtopic.refresh_from_db()
+        self.assertEqual((self.subtopic.easy_count, self.subtopic.hard_count), (3, 2))
+        self.assertEqual(Option.objects.filter(question__subtopic=self.subtopic, is_correct=True, text="b").count(), 5)
+
+    def test_invalid_rows_are_reported_by_line(self):
+        report = import_questions(self._csv(
+            f"{self.subtopic.id},easy,Fine,30,a,b,,,1\n",
+            f"{self.subtopic.id},extreme,Bad level,30,a,b,,,1\n",
+            f"{self.subtopic.id},easy,No answer,30,a,b,,,\n",
+            f"{self.subtopic.id},easy,,30,a,b,,,1\n",
+            "999999,easy,Unknown subtopic,30,a,b,,,1\n",
+        ), 'csv')
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error['line'] for error in report.errors], [3, 4, 5, 6])
+        self.assertIn("Invalid difficulty", report.errors[0]['error'])
+        self.assertIn("Exactly one option", report.errors[1]['error'])
+        self.assertIn("does not exist", report.errors[3]['error'])
+
+    def test_undecodable_and_malformed_lines_are_row_errors(self):
+        stream = io.BytesIO(
+            self.HEADER.encode()
+            + f"{self.subtopic.id},easy,Caf\xe9,30,a,b,,,1\n".encode('latin-1')
+            + f"{self.subtopic.id},easy,Broken\rfield,30,a,b,,,1\n".encode()
+            + f"{self.subtopic.id},easy,Nul\x00,30,a,b,,,1\n".encode()
+            + f"{self.subtopic.id},easy,Fine,30,a,b,,,1\n".encode()
+        )
+        report = import_questions(stream, 'csv')
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error['line'] for error in report.errors], [2, 3, 4])
+        self.assertIn("not valid UTF-8", report.errors[0]['error'])
+        self.assertIn("Malformed CSV", report.errors[1]['error'])
+        self.assertIn("NUL", report.errors[2]['error'])
+
+    def test_jsonl_upload_reports_errors_instead_of_failing(self):
+        self.client.force_login(self.boss)
+        body = (
+            json.dumps({'subtopic_id': self.subtopic.id, 'difficulty': 'medium', 'text': "Q", 'options': [
+                {'text': "a", 'is_correct': True}, {'text': "b"},
+            ]}).encode() + b"\n" + b"\xff\xfe not json\n" + b"[1, 2]\n"
+        )
+        response = self.client.post(reverse('question_import'), {
+            'file': SimpleUploadedFile("questions.jsonl", body),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3])
+
+
+class OptionApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        cls.boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        cls.question = create_question(create_subtopic())
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_students_never_see_is_correct(self):
+        response = self._client(self.student).get(reverse('option-list') + f"?question={self.question.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([set(option) for option in response.json()['results']], [{'id', 'text', 'question'}])
+
+    def test_students_cannot_write_options(self):
+        response = self._client(self.student).post(reverse('option-list'), {
+            'question': self.question.id, 'text': "5", 'is_correct': True,
+        })
+        self.assertEqual(response.status_code, 403)
+
+    def test_bosses_see_is_correct(self):
+        response = self._client(self.boss).get(reverse('option-list') + f"?question={self.question.id}")
+        self.assertEqual(response.json()['results'][0]['is_correct'], True)
+
+
+class CacheInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.subtopic = create_subtopic()
+        cls.topic = cls.subtopic.topic
+
+    def setUp(self):
+        cache.clear()
+
+    def test_catalog_version_is_bumped_on_commit(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(subtopic=self.subtopic, difficulty='easy', text="Q", time_limit=30)
+            self.assertEqual(get_catalog_version(), version)
+        self.assertNotEqual(get_catalog_version(), version)
+        self.assertEqual(get_catalog()['topics'][self.topic.id]['subtopics'][0]['easy'], 1)
+
+    def test_lesson_is_invalidated_on_commit(self):
+        self.assertEqual(get_lesson_bundle(self.subtopic.id)['resources'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(subtopic=self.subtopic, description="Primer", link="https://example.com")
+            self.assertEqual(get_lesson_bundle(self.subtopic.id)['resources'], [])
+        self.assertEqual(len(get_lesson_bundle(self.subtopic.id)['resources']), 1)
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        cls.subtopic = create_subtopic()
+        cls.topic = cls.subtopic.topic
+        cls.other_subtopic = create_subtopic("Squares", cls.topic)
+        cls.other_topic = Topic.objects.create(name="Words", category='Common', display_order=2)
+
+    def _counts(self, subtopic):
+        subtopic.refresh_from_db()
+        return subtopic.easy_count, subtopic.medium_count, subtopic.hard_count
+
+    def test_topics_and_subtopics_are_counted(self):
+        self.assertEqual(get_site_counters()['topics'], 2)
+        self.assertEqual(get_site_counters()['subtopics'], 2)
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.subtopic_count, 2)
+
+        self.other_subtopic.delete()
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.subtopic_count, 1)
+        self.assertEqual(get_site_counters()['subtopics'], 1)
+
+        self.other_topic.delete()
+        self.assertEqual(get_site_counters()['topics'], 1)
+
+    def test_site_counters_leave_out_the_topic_order_sequence(self):
+        append_topic(name="Algebra", category='Common')
+        self.assertEqual(set(get_site_counters()), {'topics', 'subtopics', 'questions', 'students'})
+        self.assertEqual(get_site_counters()['topics'], 3)
+
+    def test_subtopic_moves_between_topics(self):
+        self.other_subtopic.topic = self.other_topic
+        self.other_subtopic.save()
+        self.topic.refresh_from_db()
+        self.other_topic.refresh_from_db()
+        self.assertEqual((self.topic.subtopic_count, self.other_topic.subtopic_count), (1, 1))
+        self.assertEqual(get_site_counters()['subtopics'], 2)
+
+    def test_questions_are_counted_per_difficulty(self):
+        question = Question.objects.create(subtopic=self.subtopic, difficulty='easy', text="Q", time_limit=30)
+        Question.objects.create(subtopic=self.subtopic, difficulty='hard', text="R", time_limit=30)
+        self.assertEqual(self._counts(self.subtopic), (1, 0, 1))
+        self.assertEqual(get_site_counters()['questions'], 2)
+
+        question.difficulty = 'medium'
+        question.save()
+        self.assertEqual(self._counts(self.subtopic), (0, 1, 1))
+
+        question.subtopic = self.other_subtopic
+        question.save()
+        self.assertEqual(self._counts(self.subtopic), (0, 0, 1))
+        self.assertEqual(self._counts(self.other_subtopic), (0, 1, 0))
+
+        question.delete()
+        self.assertEqual(self._counts(self.other_subtopic), (0, 0, 0))
+        self.assertEqual(get_site_counters()['questions'], 1)
+
+    def test_students_are_counted_by_role(self):
+        student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        self.assertEqual(get_site_counters()['students'], 1)
+        student.role = 'boss'
+        student.save()
+        self.assertEqual(get_site_counters()['students'], 0)
+        student.role = 'student'
+        student.save()
+        self.assertEqual(get_site_counters()['students'], 1)
+        student.delete()
+        self.assertEqual(get_site_counters()['students'], 0)
+
+    def test_add_question_rejects_an_invalid_difficulty(self):
+        self.client.force_login(self.boss)
+        url = reverse('question_phase', args=[self.subtopic.id])
+        data = {
+            'action': 'add_question', 'text': "2+2", 'time_limit': 30, 'correct_option': "1",
+            'option1': "4", 'option2': "5", 'option3': "6", 'option4': "7",
+        }
+        for difficulty in ("", "extreme"):
+            response = self.client.post(url, {**data, 'difficulty': difficulty})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Question.objects.exists())
+
+        self.client.post(url, {**data, 'difficulty': 'medium'})
+        self.assertEqual(Option.objects.filter(question__text="2+2").count(), 4)
+        self.assertEqual(self._counts(self.subtopic), (0, 1, 0))
+
+    def test_api_cannot_write_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.boss)
+        response = client.patch(reverse('topic-detail', args=[self.topic.id]), {'subtopic_count': 99}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['subtopic_count'], 2)
+
+        response = client.post(reverse('subtopic-list'), {
+            'topic': self.topic.id, 'name': "Cubes", 'display_order': 3, 'easy_count': 5, 'hard_count': 7,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._counts(Subtopic.objects.get(name="Cubes")), (0, 0, 0))
+
+
+class QuestionEditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        cls.subtopic = create_subtopic()
+        cls.question = create_question(cls.subtopic, options=[("3", False), ("4", True), ("5", False)])
+        cls.options = list(cls.question.option_set.order_by('id'))
+        cls.answer = UserAnswer.objects.create(
+            user=cls.student, question=cls.question, option=cls.options[1], is_correct=True, time_taken=5,
+        )
+
+    def _counts(self):
+        self.subtopic.refresh_from_db()
+        return self.subtopic.easy_count, self.subtopic.medium_count, self.subtopic.hard_count
+
+    def test_update_question_keeps_option_ids_and_answers(self):
+        ids = [option.id for option in self.options]
+        update_question(self.question, "2+3", 'medium', 45, [("4", False), ("5", True), ("6", False)])
+
+        options = list(Option.objects.filter(question=self.question).order_by('id'))
+        self.assertEqual([option.id for option in options], ids)
+        self.assertEqual([(option.text, option.is_correct) for option in options],
+                         [("4", False), ("5", True), ("6", False)])
+        self.assertEqual(UserAnswer.objects.get(pk=self.answer.pk).option_id, ids[1])
+        self.assertEqual(self._counts(), (0, 1, 0))
+
+    def test_update_question_adds_and_removes_trailing_options(self):
+        ids = [option.id for option in self.options]
+        update_question(self.question, "2+2", 'easy', 30, [("3", False), ("4", True)])
+        self.assertEqual(list(Option.objects.filter(question=self.question).order_by('id').values_list('id', flat=True)),
+                         ids[:2])
+        self.assertTrue(UserAnswer.objects.filter(pk=self.answer.pk).exists())
+
+        update_question(self.question, "2+2", 'easy', 30, [("3", False), ("4", True), ("22", False)])
+        remaining = list(Option.objects.filter(question=self.question).order_by('id').values_list('id', flat=True))
+        self.assertEqual(remaining[:2], ids[:2])
+        self.assertEqual(len(remaining), 3)
+
+    def test_bulk_edit_moves_the_difficulty_counters(self):
+        Question.objects.create(subtopic=self.subtopic, difficulty='hard', text="Q", time_limit=30)
+        Question.objects.create(subtopic=self.subtopic, difficulty='medium', text="R", time_limit=30)
+        self.assertEqual(self._counts(), (1, 1, 1))
+
+        updated = bulk_edit_questions(Question.objects.filter(subtopic=self.subtopic), difficulty='hard', time_limit=90)
+        self.assertEqual(updated, 3)
+        self.assertEqual(self._counts(), (0, 0, 3))
+        self.assertEqual(set(Question.objects.values_list('time_limit', flat=True)), {90})
+        self.assertEqual(get_site_counters()['questions'], 3)
+
+
+class StreakTests(TestCase):
+    day = datetime.date(2026, 10, 1)
+
+    def _streak(self, *days):
+        streak = UserStreak(date=None, streak_count=0)
+        for day in days:
+            advance_streak(streak, day)
+        return streak
+
+    def test_consecutive_days_extend_the_streak(self):
+        streak = self._streak(self.day, self.day + datetime.timedelta(days=1))
+        self.assertEqual((streak.date, streak.streak_count, streak.longest_streak),
+                         (self.day + datetime.timedelta(days=1), 2, 2))
+
+    def test_same_day_is_ignored(self):
+        streak = self._streak(self.day)
+        self.assertFalse(advance_streak(streak, self.day))
+        self.assertFalse(advance_streak(streak, self.day - datetime.timedelta(days=3)))
+        self.assertEqual((streak.date, streak.streak_count), (self.day, 1))
+
+    def test_gap_restarts_the_streak_and_keeps_the_longest(self):
+        days = [self.day + datetime.timedelta(days=offset) for offset in (0, 1, 2, 4)]
+        streak = self._streak(*days)
+        self.assertEqual((streak.date, streak.streak_count, streak.longest_streak), (days[-1], 1, 3))
+
+    def test_backfill_recomputes_from_answers(self):
+        student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        other = User.objects.create_user(username="t", email="t@example.com", password="pw", role='student')
+        question = create_question(create_subtopic())
+        option = question.option_set.get()
+        noon = timezone.make_aware(datetime.datetime(2026, 10, 1, 12))
+        for user, offsets in ((student, (0, 0, 1, 2, 5, 6)), (other, (3,))):
+            for offset in offsets:
+                UserAnswer.objects.create(
+                    user=user, question=question, option=option, is_correct=True, time_taken=5,
+                    answered_at=noon + datetime.timedelta(days=offset),
+                )
+        UserStreak.objects.create(user=student, date=self.day, streak_count=40)
+
+        self.assertEqual(backfill_streaks(chunk_size=1), 2)
+        self.assertEqual(
+            list(UserStreak.objects.order_by('user_id').values_list('user_id', 'date', 'streak_count', 'longest_streak')),
+            [(student.id, datetime.date(2026, 10, 7), 2, 3), (other.id, datetime.date(2026, 10, 4), 1, 1)],
+        )
+
+
+class OrderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.topics = [Topic.objects.create(name=f"T{i}", category='Common', display_order=i) for i in range(1, 4)]
+        cls.other_topic = cls.topics[2]
+        cls.subtopics = [
+            Subtopic.objects.create(topic=cls.topics[0], name=f"S{i}", display_order=i) for i in range(1, 4)
+        ]
+        cls.foreign_subtopic = create_subtopic("Elsewhere", cls.other_topic)
+
+    def test_reorder_topics(self):
+        ids = [topic.id for topic in reversed(self.topics)]
+        self.assertEqual(reorder_topics(ids), 3)
+        self.assertEqual(list(Topic.objects.order_by('display_order').values_list('id', flat=True)), ids)
+
+    def test_reorder_subtopics(self):
+        ids = [subtopic.id for subtopic in reversed(self.subtopics)]
+        self.assertEqual(reorder_subtopics(self.topics[0], ids), 3)
+        self.assertEqual(
+            list(Subtopic.objects.filter(topic=self.topics[0]).order_by('display_order').values_list('id', flat=True)),
+            ids,
+        )
+
+    def test_invalid_orders_are_rejected(self):
+        ids = [subtopic.id for subtopic in self.subtopics]
+        invalid = {
+            'partial': ids[:2],
+            'duplicate': ids + [ids[0]],
+            'foreign': ids[:2] + [self.foreign_subtopic.id],
+            'unknown': ids + [9999],
+        }
+        for name, order in invalid.items():
+            with self.subTest(order=name), self.assertRaises(ValueError):
+                reorder_subtopics(self.topics[0], order)
+        with self.assertRaises(ValueError):
+            reorder_topics([topic.id for topic in self.topics[:2]])
+        self.assertEqual(
+            list(Subtopic.objects.filter(topic=self.topics[0]).order_by('display_order').values_list('id', flat=True)),
+            ids,
+        )
+
+    def test_reorder_view_rejects_invalid_orders(self):
+        boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        self.client.force_login(boss)
+        response = self.client.post(reverse('topic_reorder'), {'order': [self.topics[0].id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+
+@skipUnless(connection.vendor == 'sqlite', "Relies on SQLite taking the write lock at BEGIN")
+class ConcurrentAppendTests(TransactionTestCase):
+    THREADS = 8
+
+    def _run_concurrently(self, append):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+
+        def worker(index):
+            try:
+                barrier.wait()
+                append(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_topic_appends(self):
+        Topic.objects.create(name="First", category='Common', display_order=1)
+        self._run_concurrently(lambda index: append_topic(name=f"T{index}", category='Common'))
+        orders = list(Topic.objects.order_by('id').values_list('display_order', flat=True))
+        self.assertEqual(orders, list(range(1, self.THREADS + 2)))
+
+    def test_concurrent_subtopic_appends(self):
+        topic = Topic.objects.create(name="Numbers", category='Common', display_order=1)
+        self._run_concurrently(lambda index: append_subtopic(topic, name=f"S{index}"))
+        orders = list(Subtopic.objects.filter(topic=topic).order_by('id').values_list('display_order', flat=True))
+        self.assertEqual(orders, list(range(1, self.THREADS + 1)))
+
+
+class QuestionPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        cls.subtopic = create_subtopic()
+        # Identical apart from the id, so only the id can order them
+        cls.questions = [
+            create_question(cls.subtopic, ('easy', 'hard')[i % 2], "Same", [("a", True)]) for i in range(7)
+        ]
+
+    def _walk(self, difficulty=None, between_pages=None):
+        seen, after_id = [], 0
+        while after_id is not None:
+            page, after_id = question_page(self.subtopic, difficulty, after_id=after_id, page_size=3)
+            self.assertLessEqual(len(page), 3)
+            seen.extend(question.id for question in page)
+            if between_pages:
+                between_pages()
+                between_pages = None
+        return seen
+
+    def test_pages_cover_every_question_once(self):
+        self.assertEqual(self._walk(), [question.id for question in self.questions])
+        self.assertEqual(self._walk('hard'), [question.id for question in self.questions[1::2]])
+
+    def test_pages_are_stable_under_concurrent_edits(self):
+        ids = [question.id for question in self.questions]
+
+        def edit():
+            # Deleting a seen question must not shift later pages; a new one lands at the end
+            self.questions[0].delete()
+            return Question.objects.create(subtopic=self.subtopic, difficulty='easy', text="Same", time_limit=30)
+
+        seen = self._walk(between_pages=edit)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen[:7], ids)
+        self.assertEqual(len(seen), 8)
+
+    def test_last_page_has_no_cursor(self):
+        page, after_id = question_page(self.subtopic, after_id=self.questions[3].id, page_size=3)
+        self.assertEqual([question.id for question in page], [question.id for question in self.questions[4:]])
+        self.assertIsNone(after_id)
+
+    def test_page_view(self):
+        self.client.force_login(self.boss)
+        url = reverse('question_page', args=[self.subtopic.id])
+        response = self.client.get(url, {'after': self.questions[1].id, 'start': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 5)
+        self.assertEqual(self.client.get(url, {'after': "x"}).status_code, 400)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.boss = User.objects.create_user(username="b", email="b@example.com", password="pw", role='boss')
+        cls.primes = create_subtopic()
+        cls.numbers = cls.primes.topic
+        cls.squares = create_subtopic("Squares", cls.numbers)
+        words = Topic.objects.create(name="Words", category='Common', display_order=2)
+        cls.synonyms = create_subtopic("Synonyms", words)
+        cls.questions = {}
+        for subtopic, day in ((cls.primes, 1), (cls.squares, 2), (cls.synonyms, 3)):
+            question = create_question(subtopic, text=f"{subtopic.name}?", options=[(f"o{i}", i == 1) for i in range(5)])
+            Question.objects.filter(pk=question.pk).update(
+                created_at=timezone.make_aware(datetime.datetime(2026, 10, day, 12))
+            )
+            cls.questions[subtopic.name] = question
+        student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        question = cls.questions["Primes"]
+        cls.answer = UserAnswer.objects.create(
+            user=student, question=question, option=question.option_set.order_by('id')[1], is_correct=True,
+            time_taken=7, answered_at=timezone.make_aware(datetime.datetime(2026, 10, 5, 9)),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.boss)
+
+    def _export(self, dataset, **params):
+        response = self.client.get(reverse('export', args=[dataset]), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def _jsonl_ids(self, dataset, **params):
+        return [json.loads(line)['id'] for line in self._export(dataset, **params).splitlines()]
+
+    def test_question_filters(self):
+        ids = {name: question.id for name, question in self.questions.items()}
+        self.assertEqual(self._jsonl_ids('questions', topic=self.numbers.id), [ids["Primes"], ids["Squares"]])
+        self.assertEqual(self._jsonl_ids('questions', subtopic=self.synonyms.id), [ids["Synonyms"]])
+        self.assertEqual(self._jsonl_ids('questions', since="2026-10-02", until="2026-10-02"), [ids["Squares"]])
+
+    def test_question_csv(self):
+        rows = list(csv.reader(io.StringIO(self._export('questions', format='csv', subtopic=self.primes.id))))
+        question = self.questions["Primes"]
+        self.assertEqual(rows, [
+            ['id', 'subtopic_id', 'difficulty', 'text', 'time_limit',
+             'option1', 'option2', 'option3', 'option4', 'correct_option'],
+            [str(question.id), str(self.primes.id), 'easy', "Primes?", '30', 'o0', 'o1', 'o2', 'o3', '2'],
+        ])
+
+    def test_jsonl_keeps_every_option(self):
+        record = json.loads(self._export('questions', subtopic=self.primes.id))
+        self.assertEqual([option['text'] for option in record['options']], ['o0', 'o1', 'o2', 'o3', 'o4'])
+
+    def test_answer_export(self):
+        rows = list(csv.reader(io.StringIO(self._export('answers', format='csv'))))
+        self.assertEqual(rows[0], ['id', 'user_id', 'question_id', 'option_id', 'is_correct', 'time_taken', 'answered_at'])
+        self.assertEqual(rows[1][:6], [
+            str(self.answer.id), str(self.answer.user_id), str(self.answer.question_id),
+            str(self.answer.option_id), 'True', '7',
+        ])
+        self.assertEqual(self._jsonl_ids('answers', topic=self.numbers.id), [self.answer.id])
+        self.assertEqual(self._jsonl_ids('answers', subtopic=self.squares.id), [])
+        self.assertEqual(self._jsonl_ids('answers', since="2026-10-06"), [])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('export', args=['questions']), {'since': "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export', args=['questions']), {'format': "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export', args=['users'])).status_code, 404)
+
+
+class ApiQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        cls.numbers = Topic.objects.create(name="Numbers", category='Common', display_order=2)
+        cls.code = Topic.objects.create(name="Code", category='IT-specific', display_order=1)
+        cls.primes = create_subtopic("Primes", cls.numbers)
+        cls.loops = create_subtopic("Loops", cls.code)
+        cls.questions = [
+            create_question(subtopic, difficulty, f"Q{i}", options=[])
+            for i, (subtopic, difficulty) in enumerate([
+                (cls.primes, 'easy'), (cls.primes, 'hard'), (cls.loops, 'easy'), (cls.primes, 'easy'), (cls.loops, 'medium'),
+            ])
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def _ids(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_filters(self):
+        url = reverse('question-list')
+        q = [question.id for question in self.questions]
+        self.assertEqual(self._ids(url, subtopic=self.primes.id), [q[0], q[1], q[3]])
+        self.assertEqual(self._ids(url, subtopic=self.primes.id, difficulty='easy'), [q[0], q[3]])
+        self.assertEqual(self._ids(url, topic=self.code.id), [q[2], q[4]])
+        self.assertEqual(self._ids(url, category='IT-specific'), [q[2], q[4]])
+        self.assertEqual(self._ids(url, subtopic=""), q)
+        self.assertEqual(self._ids(reverse('subtopic-list'), category='Common'), [self.primes.id])
+
+    def test_bad_filter_value_is_a_400(self):
+        response = self.client.get(reverse('question-list'), {'subtopic': "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('subtopic', response.json())
+
+    def test_ordering(self):
+        url = reverse('topic-list')
+        self.assertEqual(self._ids(url, ordering='display_order'), [self.code.id, self.numbers.id])
+        self.assertEqual(self._ids(url, ordering='-display_order'), [self.numbers.id, self.code.id])
+        self.assertEqual(self._ids(reverse('question-list'), ordering='-id'), [q.id for q in reversed(self.questions)])
+
+    def test_cursor_pages_cover_every_row_once(self):
+        seen = []
+        response = self.client.get(reverse('question-list'), {'page_size': 2})
+        while True:
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 2)
+            seen.extend(row['id'] for row in body['results'])
+            if not body['next']:
+                break
+            response = self.client.get(body['next'])
+        self.assertEqual(seen, [question.id for question in self.questions])
+
+
+class SeedDatasetTests(TestCase):
+    SIZES = {'topics': 2, 'subtopics': 3, 'questions': 12, 'students': 3, 'answers': 40}
+    END = timezone.make_aware(datetime.datetime(2026, 10, 1))
+
+    def _seed(self, seed):
+        report = seed_dataset(seed=seed, prefix="det", end=self.END, rebuild=False, **self.SIZES)
+        rows = {
+            'questions': list(Question.objects.order_by('text').values_list('subtopic__name', 'difficulty', 'text', 'time_limit')),
+            'options': list(Option.objects.order_by('question__text', 'text').values_list('question__text', 'text', 'is_correct')),
+            'answers': list(UserAnswer.objects.order_by('id').values_list(
+                'user__username', 'question__text', 'option__text', 'is_correct', 'time_taken', 'answered_at',
+            )),
+        }
+        User.objects.filter(username__startswith="det-").delete()
+        Topic.objects.all().delete()
+        return report, rows
+
+    def test_same_seed_same_rows(self):
+        report, rows = self._seed(7)
+        self.assertEqual((report['questions'], report['options'], report['answers']), (12, 48, 40))
+        self.assertEqual(self._seed(7), (report, rows))
+        self.assertNotEqual(self._seed(8)[1]['answers'], rows['answers'])
+
+    def test_answers_fall_in_the_window_before_end(self):
+        _, rows = self._seed(7)
+        answered = [row[-1] for row in rows['answers']]
+        self.assertTrue(all(self.END - datetime.timedelta(days=30) <= moment < self.END for moment in answered))
+
+
+class CatalogVersionOrderTests(TransactionTestCase):
+    def test_version_is_bumped_after_the_counters_in_autocommit(self):
+        subtopic = create_subtopic()
+        seen = []
+        with mock.patch('aptitude.signals.bump_catalog_version',
+                        side_effect=lambda: seen.append(Subtopic.objects.get(pk=subtopic.pk).easy_count)):
+            Question.objects.create(subtopic=subtopic, difficulty='easy', text="Q", time_limit=30)
+        self.assertEqual(seen, [1])
+
+
+class CatalogConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(username="s", email="s@example.com", password="pw", role='student')
+        cls.subtopic = create_subtopic()
+        cls.topic = cls.subtopic.topic
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def test_matching_etag_is_not_modified(self):
+        for url in (reverse('home'), reverse('subtopics', args=[self.topic.id]),
+                    reverse('video_lesson', args=[self.subtopic.id])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_committed_change_serves_a_fresh_page(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Topic.objects.create(name="Algebra", category='Common', display_order=2)
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "Algebra")
+
+    def test_missing_objects_are_not_found_whatever_the_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        for url in (reverse('subtopics', args=[9999]), reverse('video_lesson', args=[9999])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+@override_settings(ANSWER_INGEST={'ASYNC': True, 'BATCH_SIZE': 100, 'FLUSH_INTERVAL': 60})
+class AnswerBufferTests(TransactionTestCase):
+    """The async ingest path, with a flush interval long enough that only the test flushes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="student", email="student@example.com", password="x")
+        subtopic = create_subtopic()
+        self.questions = [create_question(subtopic, text=f"Q{i}", options=[("a", True)]) for i in range(2)]
+        self.options = [question.option_set.get() for question in self.questions]
+        self.buffer = AnswerBuffer()
+        self.addCleanup(self.buffer.shutdown)
+
+    def _submit(self, index):
+        self.buffer.submit(pending_answer(self.user, self.questions[index], self.options[index], 5))
+
+    def test_flush_writes_buffered_answers(self):
+        self._submit(0)
+        self._submit(1)
+        self.assertEqual(UserAnswer.objects.count(), 0)
+        self.assertTrue(self.buffer.flush())
+        self.assertEqual(UserAnswer.objects.count(), 2)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_transient_failure_requeues_the_batch(self):
+        self._submit(0)
+        self._submit(1)
+        with mock.patch('aptitude.ingest.record_answers', side_effect=OperationalError("database is locked")), \
+                self.assertLogs('aptitude.ingest', 'ERROR'):
+            self.assertFalse(self.buffer.flush())
+        self.assertEqual(len(self.buffer), 2)
+        self.assertTrue(self.buffer.flush())
+        self.assertEqual(UserAnswer.objects.count(), 2)
+
+    def test_unwritable_answer_is_dropped_without_blocking_the_rest(self):
+        self._submit(0)
+        self._submit(1)
+        self.questions[0].delete()
+        with self.assertLogs('aptitude.ingest', 'ERROR') as logs:
+            self.assertTrue(self.buffer.flush())
+        self.assertTrue(any("Dropping an answer" in line for line in logs.output))
+        self.assertEqual(list(UserAnswer.objects.values_list('question_id', flat=True)), [self.questions[1].id])
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_shutdown_drains_the_buffer(self):
+        for index in (0, 1, 0):
+            self._submit(index)
+        self.buffer.shutdown()
+        self.assertEqual(UserAnswer.objects.count(), 3)
+        self.assertEqual(len(self.buffer), 0)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing against a real second database: the replica alias is a snapshot of
+    the test database taken in setUp, so it lags behind every later write.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # Registered here rather than in settings, after the test runner has set up its databases
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        cls.replica_name = os.path.join(cls.replica_dir.name, 'replica.sqlite3')
+        connections.settings[REPLICA_DB_ALIAS] = {**connections['default'].settings_dict, 'NAME': cls.replica_name}
+        cls._snapshot()
+        cls.databases = {'default', REPLICA_DB_ALIAS}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_DB_ALIAS].close()
+        del connections[REPLICA_DB_ALIAS]
+        del connections.settings[REPLICA_DB_ALIAS]
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def _snapshot(cls):
+        connections[REPLICA_DB_ALIAS].close()
+        source = sqlite3.connect(connections['default'].settings_dict['NAME'])
+        target = sqlite3.connect(cls.replica_name)
+        with source, target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+    def setUp(self):
+        self.student = User.objects.create_user(username="r", email="r@example.com", password="pw", role='student')
+        self.topic = Topic.objects.create(name="Numbers", category='Common', display_order=1)
+        self._snapshot()
+        patcher = mock.patch.object(PrimaryReplicaRouter, '_has_replica', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+        self.addCleanup(end_request, start_request())
+
+    def test_reads_go_to_the_replica_until_the_request_writes(self):
+        self.assertEqual(self.router.db_for_read(Topic), REPLICA_DB_ALIAS)
+        Topic.objects.create(name="Lag", category='Common', display_order=2)
+        self.assertEqual(self.router.db_for_read(Topic), 'default')
+        self.assertTrue(Topic.objects.filter(name="Lag").exists())
+
+    def test_reads_inside_transactions_use_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Topic), 'default')
+        self.assertEqual(self.router.db_for_read(Topic), REPLICA_DB_ALIAS)
+
+    def test_sessions_and_users_are_read_from_the_primary(self):
+        for model in (Session, User, Permission):
+            self.assertEqual(self.router.db_for_read(model), 'default')
+
+    def test_login_survives_the_pin_expiring(self):
+        response = self.client.post(reverse('login'), {'email': self.student.email, 'password': "pw"})
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+        # The pin has expired, the replica still has no session row for this login
+        del self.client.cookies[PRIMARY_PIN_COOKIE]
+        self.assertFalse(Session.objects.using(REPLICA_DB_ALIAS).exists())
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
@@ -18,4 +18,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name='register'),  # API routes
     path('me/', MeView.as_view(), name='me'),
+    path('practice/<int:subtopic_id>/<str:difficulty>/', PracticeSetView.as_view(), name='practice_set'),
 ]
@@ -6,7 +6,22 @@ from django.contrib.auth.forms import AuthenticationForm
 # Create your views here.
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import logout
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import condition, require_POST
+from .practice import finish_adaptive_step, get_adaptive_step, get_practice_step, get_selected_option
+from .progress import get_progress
+from .ingest import submit_answer
+from .analytics import get_user_analytics
+from .catalog import get_catalog, get_catalog_last_modified, get_catalog_version, question_page
+from .counters import QUESTIONS, STUDENTS, SUBTOPICS, TOPICS, get_site_counters
+from .lessons import get_lesson_bundle
+from .questions import bulk_edit_questions, update_question
+from .ordering import append_subtopic, append_topic, reorder_subtopics, reorder_topics
+from .importers import FORMATS as IMPORT_FORMATS, detect_format, import_questions
+from .exporters import CONTENT_TYPES as EXPORT_CONTENT_TYPES, FORMATS as EXPORT_FORMATS, export_answers, export_questions, parse_day
+from .metrics import render_metrics, scrape_allowed
 
 def login_view(request):
     if request.method == 'POST':
@@ -50,7 +65,7 @@ def signup_view(request):
             role='student'
         )
 
-        login(request, user)  # Automatically log in the new user
+        login(request, user, backend="aptitude.backends.EmailBackend")  # Automatically log in the new user
         return redirect("home")
 
     return render(request, "aptitude/signup.html")
@@ -62,19 +77,56 @@ def logout_view(request):
     logout(request)
     return redirect('login')
 
+def _catalog_etag(request, *args, **kwargs):
+    # Pages vary by user (role-specific navigation), so the user is part of the tag
+    return f"catalog-{get_catalog_version()}-user-{request.user.pk}"
+
+
+def _catalog_last_modified(request, *args, **kwargs):
+    return get_catalog_last_modified()
+
+
+def catalog_conditional(exists=None):
+    """
+    Conditional GET on the catalog version. ``exists(**kwargs)`` is checked
+    first, so a missing object is a 404 rather than a 304 on a matching tag.
+    """
+    conditional = condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)
+
+    def decorator(view_func):
+        conditional_view = conditional(view_func)
+
+        def wrapper(request, *args, **kwargs):
+            if exists is not None and not exists(**kwargs):
+                raise Http404
+            return conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _topic_exists(topic_id):
+    return topic_id in get_catalog()['topics']
+
+
+def _subtopic_exists(subtopic_id):
+    return get_lesson_bundle(subtopic_id) is not None
+
+
 @login_required
+@catalog_conditional()
 def home_view(request):
     # Organize topics by category, excluding specified topics
     excluded_topics = ['Number Theory', 'Data Science', 'Intensive Data Analysis']
+    categories = get_catalog()['categories']
 
-    common_topics = Topic.objects.filter(category='Common').exclude(name__in=excluded_topics).order_by("display_order")
-    it_topics = Topic.objects.filter(category='IT-specific').exclude(name__in=excluded_topics).order_by("display_order")
-    govt_topics = Topic.objects.filter(category='Govt-specific').exclude(name__in=excluded_topics).order_by("display_order")
+    def visible(category):
+        return [topic for topic in categories.get(category, []) if topic['name'] not in excluded_topics]
 
     context = {
-        'common_topics': common_topics,
-        'it_topics': it_topics,
-        'govt_topics': govt_topics,
+        'common_topics': visible('Common'),
+        'it_topics': visible('IT-specific'),
+        'govt_topics': visible('Govt-specific'),
+        'catalog_version': get_catalog_version(),
     }
     return render(request, "aptitude/home.html", context)
 
@@ -82,14 +134,8 @@ def home_view(request):
 @login_required
 def analytics_view(request):
     """Analytics page showing user's progress and statistics"""
-    # Get user's visited topics and questions completed
-    # For now, we'll show placeholder data
-    context = {
-        'topics_visited': 5,
-        'questions_completed': 25,
-        'average_score': 78,
-        'time_spent': '2h 30m',
-    }
+    # Read from the precomputed daily rollups, never from raw answers
+    context = get_user_analytics(request.user)
     return render(request, "aptitude/analytics.html", context)
 
 
@@ -100,62 +146,64 @@ def contests_view(request):
 
 
 @login_required
+@catalog_conditional(_topic_exists)
 def subtopics_view(request, topic_id):
-    topic = get_object_or_404(Topic, id=topic_id)
-    subtopics = Subtopic.objects.filter(topic=topic).order_by('display_order')
+    topic = get_catalog()['topics'].get(topic_id)
+    if topic is None:
+        raise Http404("No Topic matches the given query.")
     return render(request, "aptitude/subtopics.html", {
         "topic": topic,
-        "subtopics": subtopics
+        "subtopics": topic['subtopics'],
+        "catalog_version": get_catalog_version(),
     })
 
 @login_required
+@catalog_conditional(_subtopic_exists)
 def video_lesson_view(request, subtopic_id):
-    subtopic = get_object_or_404(Subtopic, id=subtopic_id)
-    video = VideoLesson.objects.filter(subtopic=subtopic).first()
-    notes = Note.objects.filter(subtopic=subtopic)
-    resources = Resource.objects.filter(subtopic=subtopic)
-    
+    bundle = get_lesson_bundle(subtopic_id)
+    if bundle is None:
+        raise Http404("No Subtopic matches the given query.")
+
     return render(request, "aptitude/video_lesson.html", {
-        "subtopic": subtopic,
-        "video": video,
-        "notes": notes,
-        "resources": resources,
+        **bundle,
+        "catalog_version": get_catalog_version(),
     })
 
 
+@login_required
+def note_content_view(request, note_id):
+    """Full body of a note, loaded on demand by the lesson page."""
+    note = get_object_or_404(Note.objects.only('id', 'heading', 'content'), id=note_id)
+    return JsonResponse({"id": note.id, "heading": note.heading, "content": note.content})
+
+
 @login_required
 def practice_view(request, subtopic_id, difficulty, q_index=0):
     subtopic = get_object_or_404(Subtopic, id=subtopic_id)
-    questions = Question.objects.filter(subtopic=subtopic, difficulty=difficulty).order_by('id')
+    question_ids, question = get_practice_step(request, subtopic.id, difficulty, q_index)
 
-    if not questions.exists():
+    if not question_ids:
         return render(request, "aptitude/no_questions.html", {
             "subtopic": subtopic,
             "difficulty": difficulty,
             "message": "No questions yet for this difficulty level."
         })
 
-    try:
-        question = questions[q_index]
-    except IndexError:
+    if question is None:
         return render(request, "aptitude/practice_complete.html", {
             "subtopic": subtopic,
             "difficulty": difficulty,
             "message": "You've completed all questions!"
         })
 
-    options = Option.objects.filter(question=question)
-
     if request.method == "POST":
         selected_option_id = int(request.POST.get("option_id"))
-        selected_option = get_object_or_404(Option, id=selected_option_id)
+        selected_option = get_selected_option(question, selected_option_id)
 
-        is_correct = selected_option.is_correct
-        UserAnswer.objects.create(
+        submit_answer(
             user=request.user,
             question=question,
             option=selected_option,
-            is_correct=is_correct,
             time_taken=int(request.POST.get("time_taken", 0))
         )
 
@@ -165,7 +213,7 @@ def practice_view(request, subtopic_id, difficulty, q_index=0):
     return render(request, "aptitude/practice.html", {
         "subtopic": subtopic,
         "question": question,
-        "options": options,
+        "options": question.option_set.all(),
         "difficulty": difficulty,
         "q_index": q_index,
     })
@@ -174,58 +222,99 @@ def practice_view(request, subtopic_id, difficulty, q_index=0):
 @login_required
 def practice_new_view(request, subtopic_id, difficulty, q_index=0):
     subtopic = get_object_or_404(Subtopic, id=subtopic_id)
-    questions = Question.objects.filter(subtopic=subtopic, difficulty=difficulty).order_by('id')
+    question_ids, question = get_practice_step(request, subtopic.id, difficulty, q_index)
 
-    if not questions.exists():
+    if not question_ids:
         return render(request, "aptitude/no_questions.html", {
             "subtopic": subtopic,
             "difficulty": difficulty,
             "message": "No questions yet for this difficulty level."
         })
 
-    try:
-        question = questions[q_index]
-    except IndexError:
+    if question is None:
         return render(request, "aptitude/practice_complete.html", {
             "subtopic": subtopic,
             "difficulty": difficulty,
             "message": "You've completed all questions!"
         })
 
-    options = Option.objects.filter(question=question)
-
-    # Calculate progress
-    total_questions = questions.count()
-    user_answers = UserAnswer.objects.filter(user=request.user, question__in=questions)
-    solved_count = user_answers.count()
-    remaining_count = total_questions - solved_count
-
     if request.method == "POST":
         selected_option_id = int(request.POST.get("option_id"))
-        selected_option = get_object_or_404(Option, id=selected_option_id)
+        selected_option = get_selected_option(question, selected_option_id)
 
-        is_correct = selected_option.is_correct
-        UserAnswer.objects.create(
+        submit_answer(
             user=request.user,
             question=question,
             option=selected_option,
-            is_correct=is_correct,
             time_taken=int(request.POST.get("time_taken", 0))
         )
 
         # Redirect to next question
         return redirect('practice_new', subtopic_id=subtopic.id, difficulty=difficulty, q_index=q_index+1)
 
+    # Calculate progress
+    total_questions = len(question_ids)
+    progress = get_progress(request.user, subtopic, difficulty)
+    solved_count = progress.solved_count
+    remaining_count = max(total_questions - solved_count, 0)
+
     return render(request, "aptitude/practice_new.html", {
         "subtopic": subtopic,
         "question": question,
-        "options": options,
+        "options": question.option_set.all(),
         "difficulty": difficulty,
         "q_index": q_index,
         "total_questions": total_questions,
         "solved_count": solved_count,
         "remaining_count": remaining_count,
     })
+
+
+@login_required
+def practice_adaptive_view(request, subtopic_id):
+    """Practice across all difficulties, each next question picked for the student's rating."""
+    subtopic = get_object_or_404(Subtopic, id=subtopic_id)
+    answered_count, question = get_adaptive_step(request, subtopic.id)
+
+    if request.method == "POST":
+        if question is None:
+            return redirect('practice_adaptive', subtopic_id=subtopic.id)
+        selected_option_id = int(request.POST.get("option_id"))
+        selected_option = get_selected_option(question, selected_option_id)
+
+        submit_answer(
+            user=request.user,
+            question=question,
+            option=selected_option,
+            time_taken=int(request.POST.get("time_taken", 0))
+        )
+        finish_adaptive_step(request, subtopic.id)
+
+        return redirect('practice_adaptive', subtopic_id=subtopic.id)
+
+    if question is None and not answered_count:
+        return render(request, "aptitude/no_questions.html", {
+            "subtopic": subtopic,
+            "difficulty": "adaptive",
+            "message": "No questions yet for this subtopic."
+        })
+
+    if question is None:
+        return render(request, "aptitude/practice_complete.html", {
+            "subtopic": subtopic,
+            "difficulty": "adaptive",
+            "adaptive": True,
+            "message": "You've completed all questions!"
+        })
+
+    return render(request, "aptitude/practice.html", {
+        "subtopic": subtopic,
+        "question": question,
+        "options": question.option_set.all(),
+        "difficulty": question.difficulty,
+        "q_index": answered_count,
+        "adaptive": True,
+    })
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
 
@@ -240,15 +329,19 @@ def boss_required(view_func):
 from .models import Topic, Subtopic
 #from .decorators import boss_required  # or use local function
 
+def _dashboard_totals():
+    counters = get_site_counters()
+    return {
+        "total_topics": counters[TOPICS],
+        "total_subtopics": counters[SUBTOPICS],
+        "total_questions": counters[QUESTIONS],
+        "total_users": counters[STUDENTS],
+    }
+
+
 @boss_required
 def boss_dashboard(request):
-    from .models import Question, User
-    topics = Topic.objects.all().order_by("display_order")
-
-    # Calculate statistics
-    total_subtopics = Subtopic.objects.count()
-    total_questions = Question.objects.count()
-    total_users = User.objects.filter(role='student').count()
+    topics = sorted(get_catalog()['topics'].values(), key=lambda topic: topic['display_order'])
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -257,14 +350,9 @@ def boss_dashboard(request):
             name = request.POST.get("name")
             category = request.POST.get("category")
 
-            # Find the next display_order
-            max_order = Topic.objects.aggregate(max_order=models.Max('display_order'))['max_order'] or 0
-            display_order = max_order + 1
-
-            Topic.objects.create(
+            append_topic(
                 name=name,
                 category=category,
-                display_order=display_order,
                 created_by=request.user
             )
         
@@ -284,9 +372,7 @@ def boss_dashboard(request):
             if Subtopic.objects.filter(topic=topic).exists():
                 return render(request, "aptitude/boss_dashboard.html", {
                     "topics": topics,
-                    "total_subtopics": total_subtopics,
-                    "total_questions": total_questions,
-                    "total_users": total_users,
+                    **_dashboard_totals(),
                     "error": "Cannot delete topic. Subtopics exist."
                 })
             topic.delete()
@@ -295,31 +381,45 @@ def boss_dashboard(request):
 
     return render(request, "aptitude/boss_dashboard.html", {
         "topics": topics,
-        "total_subtopics": total_subtopics,
-        "total_questions": total_questions,
-        "total_users": total_users,
+        **_dashboard_totals(),
     })
 
 
+def _ordered_ids(request):
+    try:
+        return [int(pk) for pk in request.POST.getlist("order")]
+    except ValueError:
+        raise ValueError("The order must be a list of ids")
+
+
+@require_POST
 @boss_required
-def subtopic_phase_view(request, topic_id):
-    topic = get_object_or_404(Topic, id=topic_id)
-    subtopics = Subtopic.objects.filter(topic=topic).order_by('display_order')
+def topic_reorder_view(request):
+    """Drag-and-drop reorder: POST every topic id, in the new order, as 'order'."""
+    try:
+        updated = reorder_topics(_ordered_ids(request))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"updated": updated})
 
-    # Count questions by difficulty for each subtopic
-    subtopic_data = []
-    for subtopic in subtopics:
-        easy_count = Question.objects.filter(subtopic=subtopic, difficulty='easy').count()
-        medium_count = Question.objects.filter(subtopic=subtopic, difficulty='medium').count()
-        hard_count = Question.objects.filter(subtopic=subtopic, difficulty='hard').count()
 
-        subtopic_data.append({
+def _subtopic_data(topic):
+    """Subtopics of a topic with their question counts by difficulty."""
+    return [
+        {
             'subtopic': subtopic,
-            'easy_count': easy_count,
-            'medium_count': medium_count,
-            'hard_count': hard_count,
-            'total_count': easy_count + medium_count + hard_count
-        })
+            'easy_count': subtopic.easy_count,
+            'medium_count': subtopic.medium_count,
+            'hard_count': subtopic.hard_count,
+            'total_count': subtopic.question_count,
+        }
+        for subtopic in Subtopic.objects.filter(topic=topic).order_by('display_order')
+    ]
+
+
+@boss_required
+def subtopic_phase_view(request, topic_id):
+    topic = get_object_or_404(Topic, id=topic_id)
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -327,14 +427,9 @@ def subtopic_phase_view(request, topic_id):
         if action == "add_subtopic":
             name = request.POST.get("name")
 
-            # Find the next display_order
-            max_order = Subtopic.objects.filter(topic=topic).aggregate(max_order=models.Max('display_order'))['max_order'] or 0
-            display_order = max_order + 1
-
-            Subtopic.objects.create(
+            append_subtopic(
+                topic,
                 name=name,
-                topic=topic,
-                display_order=display_order,
                 created_by=request.user
             )
 
@@ -352,7 +447,7 @@ def subtopic_phase_view(request, topic_id):
             if Question.objects.filter(subtopic=subtopic).exists():
                 return render(request, "aptitude/subtopic_phase.html", {
                     "topic": topic,
-                    "subtopic_data": subtopic_data,
+                    "subtopic_data": _subtopic_data(topic),
                     "error": "Cannot delete subtopic. Questions exist."
                 })
             subtopic.delete()
@@ -361,10 +456,22 @@ def subtopic_phase_view(request, topic_id):
 
     return render(request, "aptitude/subtopic_phase.html", {
         "topic": topic,
-        "subtopic_data": subtopic_data
+        "subtopic_data": _subtopic_data(topic)
     })
 
 
+@require_POST
+@boss_required
+def subtopic_reorder_view(request, topic_id):
+    """Drag-and-drop reorder: POST every subtopic id of the topic, in the new order, as 'order'."""
+    topic = get_object_or_404(Topic, id=topic_id)
+    try:
+        updated = reorder_subtopics(topic, _ordered_ids(request))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"updated": updated})
+
+
 @boss_required
 def question_phase_view(request, subtopic_id):
     subtopic = get_object_or_404(Subtopic, id=subtopic_id)
@@ -372,21 +479,6 @@ def question_phase_view(request, subtopic_id):
     # Get filter parameter
     difficulty_filter = request.GET.get('difficulty', 'all')
 
-    # Filter questions based on difficulty
-    if difficulty_filter == 'all':
-        questions = Question.objects.filter(subtopic=subtopic).order_by('id')
-    else:
-        questions = Question.objects.filter(subtopic=subtopic, difficulty=difficulty_filter).order_by('id')
-
-    # Get questions with their options
-    question_data = []
-    for question in questions:
-        options = Option.objects.filter(question=question)
-        question_data.append({
-            'question': question,
-            'options': options
-        })
-
     if request.method == "POST":
         action = request.POST.get("action")
 
@@ -401,30 +493,34 @@ def question_phase_view(request, subtopic_id):
             option4 = request.POST.get("option4")
             correct_option = request.POST.get("correct_option")
 
-            # Create question
-            question = Question.objects.create(
-                subtopic=subtopic,
-                text=text,
-                difficulty=difficulty,
-                time_limit=int(time_limit),
-                created_by=request.user
-            )
-
-            # Create options
-            options_data = [
-                (option1, correct_option == "1"),
-                (option2, correct_option == "2"),
-                (option3, correct_option == "3"),
-                (option4, correct_option == "4")
-            ]
-
-            for option_text, is_correct in options_data:
-                Option.objects.create(
-                    question=question,
-                    text=option_text,
-                    is_correct=is_correct
+            if difficulty not in dict(Question.DIFFICULTY_CHOICES):
+                return JsonResponse({"error": f"Invalid difficulty '{difficulty}'."}, status=400)
+
+            # A question without its options must never be committed
+            with transaction.atomic():
+                question = Question.objects.create(
+                    subtopic=subtopic,
+                    text=text,
+                    difficulty=difficulty,
+                    time_limit=int(time_limit),
+                    created_by=request.user
                 )
 
+                # Create options
+                options_data = [
+                    (option1, correct_option == "1"),
+                    (option2, correct_option == "2"),
+                    (option3, correct_option == "3"),
+                    (option4, correct_option == "4")
+                ]
+
+                for option_text, is_correct in options_data:
+                    Option.objects.create(
+                        question=question,
+                        text=option_text,
+                        is_correct=is_correct
+                    )
+
         elif action == "edit_question":
             question_id = request.POST.get("question_id")
             text = request.POST.get("text")
@@ -437,29 +533,17 @@ def question_phase_view(request, subtopic_id):
             option4 = request.POST.get("option4")
             correct_option = request.POST.get("correct_option")
 
-            # Update question
-            question = get_object_or_404(Question, id=question_id)
-            question.text = text
-            question.difficulty = difficulty
-            question.time_limit = int(time_limit)
-            question.save()
-
-            # Delete existing options and create new ones
-            Option.objects.filter(question=question).delete()
+            if difficulty not in dict(Question.DIFFICULTY_CHOICES):
+                return JsonResponse({"error": f"Invalid difficulty '{difficulty}'."}, status=400)
 
-            options_data = [
+            # Options are updated in place so answers that reference them survive
+            question = get_object_or_404(Question, id=question_id)
+            update_question(question, text, difficulty, int(time_limit), [
                 (option1, correct_option == "1"),
                 (option2, correct_option == "2"),
                 (option3, correct_option == "3"),
                 (option4, correct_option == "4")
-            ]
-
-            for option_text, is_correct in options_data:
-                Option.objects.create(
-                    question=question,
-                    text=option_text,
-                    is_correct=is_correct
-                )
+            ])
 
         elif action == "delete_question":
             question_id = request.POST.get("question_id")
@@ -468,19 +552,147 @@ def question_phase_view(request, subtopic_id):
 
         return redirect(f"{request.path}?difficulty={difficulty_filter}")
 
+    # First page only, further pages are fetched from question_page_view
+    questions, next_after = question_page(subtopic, None if difficulty_filter == 'all' else difficulty_filter)
+
     return render(request, "aptitude/question_phase.html", {
         "subtopic": subtopic,
-        "question_data": question_data,
+        "questions": questions,
+        "next_after": next_after,
         "difficulty_filter": difficulty_filter
     })
 
 
+@boss_required
+def question_page_view(request, subtopic_id):
+    """JSON fragment with the next page of questions for the boss question screen."""
+    subtopic = get_object_or_404(Subtopic, id=subtopic_id)
+    difficulty_filter = request.GET.get('difficulty', 'all')
+    try:
+        after_id = int(request.GET.get('after', 0))
+        start_index = int(request.GET.get('start', 0))
+    except ValueError:
+        return JsonResponse({"error": "Invalid page parameters."}, status=400)
+
+    questions, next_after = question_page(
+        subtopic,
+        None if difficulty_filter == 'all' else difficulty_filter,
+        after_id=after_id
+    )
+    html = render_to_string("aptitude/question_items.html", {
+        "questions": questions,
+        "start_index": start_index,
+    }, request=request)
+
+    return JsonResponse({
+        "html": html,
+        "count": len(questions),
+        "next_after": next_after,
+    })
+
+
+@require_POST
+@boss_required
+def question_bulk_edit_view(request, subtopic_id):
+    """Set difficulty and/or time limit on many questions of a subtopic at once."""
+    subtopic = get_object_or_404(Subtopic, id=subtopic_id)
+    try:
+        question_ids = [int(question_id) for question_id in request.POST.getlist("question_ids")]
+    except ValueError:
+        return JsonResponse({"error": "Invalid question ids."}, status=400)
+    if not question_ids:
+        return JsonResponse({"error": "No questions selected."}, status=400)
+
+    difficulty = request.POST.get("difficulty") or None
+    if difficulty is not None and difficulty not in dict(Question.DIFFICULTY_CHOICES):
+        return JsonResponse({"error": f"Invalid difficulty '{difficulty}'."}, status=400)
+
+    time_limit = request.POST.get("time_limit") or None
+    if time_limit is not None:
+        try:
+            time_limit = int(time_limit)
+        except ValueError:
+            time_limit = 0
+        if time_limit <= 0:
+            return JsonResponse({"error": "time_limit must be a positive integer."}, status=400)
+
+    if difficulty is None and time_limit is None:
+        return JsonResponse({"error": "Nothing to change."}, status=400)
+
+    updated = bulk_edit_questions(
+        Question.objects.filter(subtopic=subtopic, id__in=question_ids),
+        difficulty=difficulty,
+        time_limit=time_limit,
+    )
+    return JsonResponse({"updated": updated})
+
+
+@require_POST
+@boss_required
+def question_import_view(request):
+    """Upload a CSV/JSONL question bank; responds with the import report as JSON."""
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "No file uploaded."}, status=400)
+
+    fmt = request.POST.get("format") or detect_format(upload.name)
+    if fmt not in IMPORT_FORMATS:
+        return JsonResponse({"error": f"Unsupported format '{fmt}'."}, status=400)
+
+    # Read the upload as a binary stream, import_questions decodes it line by line
+    report = import_questions(
+        upload.file,
+        fmt,
+        created_by=request.user,
+        default_subtopic_id=request.POST.get("subtopic_id")
+    )
+    return JsonResponse(report.as_dict())
+
+
+@boss_required
+def export_view(request, dataset):
+    """Stream the question bank or answer history as JSONL/CSV, optionally filtered."""
+    exporters = {"questions": export_questions, "answers": export_answers}
+    if dataset not in exporters:
+        return JsonResponse({"error": f"Unknown dataset '{dataset}'."}, status=404)
+
+    fmt = request.GET.get("format", "jsonl")
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"Unsupported format '{fmt}'."}, status=400)
+
+    try:
+        filters = {
+            "topic_id": int(request.GET["topic"]) if request.GET.get("topic") else None,
+            "subtopic_id": int(request.GET["subtopic"]) if request.GET.get("subtopic") else None,
+            "since": parse_day(request.GET["since"]) if request.GET.get("since") else None,
+            "until": parse_day(request.GET["until"]) if request.GET.get("until") else None,
+        }
+    except ValueError:
+        return JsonResponse({"error": "Invalid filter parameters."}, status=400)
+
+    response = StreamingHttpResponse(
+        exporters[dataset](fmt, **filters),
+        content_type=EXPORT_CONTENT_TYPES[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, merged across worker processes. See aptitude/metrics.py for access."""
+    if not scrape_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 from rest_framework import viewsets,generics
+from rest_framework.permissions import SAFE_METHODS, BasePermission, IsAuthenticated
 from .models import *
 from .serializers import *
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import MyTokenObtainPairSerializer
+from .pagination import CatalogPagination, OptionPagination, PracticeSetPagination
+from django.db.models import Prefetch
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -494,33 +706,74 @@ class MyTokenObtainPairView(TokenObtainPairView):
 class TopicViewSet(viewsets.ModelViewSet):
     queryset = Topic.objects.all()
     serializer_class = TopicSerializer
+    pagination_class = CatalogPagination
+    filter_fields = {'category': 'category'}
+    ordering_fields = ['id', 'display_order']
 
 class SubtopicViewSet(viewsets.ModelViewSet):
     queryset = Subtopic.objects.all()
     serializer_class = SubtopicSerializer
+    pagination_class = CatalogPagination
+    filter_fields = {'topic': 'topic_id', 'category': 'topic__category'}
+    ordering_fields = ['id', 'display_order']
 
 class VideoLessonViewSet(viewsets.ModelViewSet):
     queryset = VideoLesson.objects.all()
     serializer_class = VideoLessonSerializer
+    filter_fields = {'subtopic': 'subtopic_id', 'topic': 'subtopic__topic_id'}
+    ordering_fields = ['id']
 
 class NoteViewSet(viewsets.ModelViewSet):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
+    filter_fields = {'subtopic': 'subtopic_id', 'topic': 'subtopic__topic_id'}
+    ordering_fields = ['id']
 
 class ResourceViewSet(viewsets.ModelViewSet):
     queryset = Resource.objects.all()
     serializer_class = ResourceSerializer
+    filter_fields = {'subtopic': 'subtopic_id', 'topic': 'subtopic__topic_id'}
+    ordering_fields = ['id']
 
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
+    filter_fields = {
+        'subtopic': 'subtopic_id',
+        'difficulty': 'difficulty',
+        'topic': 'subtopic__topic_id',
+        'category': 'subtopic__topic__category',
+    }
+    ordering_fields = ['id']
+
+class IsBossOrReadOnly(BasePermission):
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or getattr(request.user, 'role', None) == 'boss'
 
 class OptionViewSet(viewsets.ModelViewSet):
+    # Students get the options without is_correct (see OptionSerializer) and cannot change them
     queryset = Option.objects.all()
     serializer_class = OptionSerializer
+    permission_classes = [IsAuthenticated, IsBossOrReadOnly]
+    pagination_class = OptionPagination
+    filter_fields = {'question': 'question_id', 'subtopic': 'question__subtopic_id'}
+    ordering_fields = ['id']
+
+class PracticeSetView(generics.ListAPIView):
+    """A page of practice questions with their options nested, in two SQL queries."""
+    serializer_class = PracticeQuestionSerializer
+    pagination_class = PracticeSetPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        return (
+            Question.objects
+            .filter(subtopic_id=self.kwargs['subtopic_id'], difficulty=self.kwargs['difficulty'])
+            .only('id', 'subtopic_id', 'difficulty', 'text', 'time_limit')
+            .prefetch_related(Prefetch('option_set', queryset=Option.objects.only('id', 'text', 'question_id').order_by('id')))
+        )
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
 
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
@@ -533,19 +786,19 @@ class MeView(APIView):
             "role": user.role
         })
 
-class UserStreakViewSet(viewsets.ModelViewSet):
+class UserStreakViewSet(viewsets.ReadOnlyModelViewSet):
+    # Streaks are computed from answers (see aptitude/streaks.py), not posted by clients
     serializer_class = UserStreakSerializer
     permission_classes = [IsAuthenticated]
+    ordering_fields = ['id', 'date']
 
     def get_queryset(self):
         return UserStreak.objects.filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-
 class NotificationSettingViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSettingSerializer
     permission_classes = [IsAuthenticated]
+    ordering_fields = ['id']
 
     def get_queryset(self):
         return NotificationSetting.objects.filter(user=self.request.user)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,7 +44,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'aptitude.middleware.RequestProfilingMiddleware',
+    'aptitude.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'aptitude.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,6 +83,58 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests, checking them before reuse
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN, so concurrent writers wait on the
+            # busy timeout instead of failing to upgrade a read lock
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # A file rather than shared-cache memory, so tests that use threads
+        # get real connections with the same PRAGMAs as production. Kept in
+        # the temp dir so test runs leave nothing in the checkout
+        'TEST': {
+            'NAME': os.path.join(tempfile.gettempdir(), 'aptitude_test_db.sqlite3'),
+        },
+    }
+}
+
+# PRAGMAs applied to every new SQLite connection, see aptitude/signals.py.
+# Pick a profile with the SQLITE_PROFILE environment variable.
+SQLITE_PROFILES = {
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 20000,
+    },
+    'default': {},
+}
+SQLITE_PRAGMAS = SQLITE_PROFILES[os.environ.get('SQLITE_PROFILE', 'production')]
+
+# Optional read replica: reads go to it, writes to 'default', see aptitude/routers.py.
+# Locally, point DATABASE_REPLICA_NAME at a copy of db.sqlite3.
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['aptitude.routers.PrimaryReplicaRouter']
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The catalog cache is versioned, so with several worker processes point this
+# at a shared backend (Memcached/Redis) to make invalidations visible to all.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'aptitude',
     }
 }
 
@@ -134,7 +191,36 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'aptitude.pagination.IdCursorPagination',
+    'DEFAULT_FILTER_BACKENDS': (
+        'aptitude.filters.QueryParamFilterBackend',
+        'rest_framework.filters.OrderingFilter',
+    ),
 }
+# Opt-in: buffer practice answers in-process and write them in batches, see aptitude/ingest.py.
+# Progress shown right after an answer can then lag by up to FLUSH_INTERVAL.
+ANSWER_INGEST = {
+    'ASYNC': os.environ.get('ANSWER_INGEST_ASYNC') == '1',
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.5,
+}
+# Opt-in per-request profiling (Server-Timing header + JSON lines), see aptitude/profiling.py
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING') == '1',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0.01)),
+    'LOG_FILE': os.environ.get('REQUEST_PROFILING_LOG_FILE', os.path.join(tempfile.gettempdir(), 'request_profile.jsonl')),
+    'TRACEMALLOC': False,
+}
+# Prometheus metrics at /metrics; each worker process writes its totals to DIR, see aptitude/metrics.py
+METRICS = {
+    # Opt-in; behind a proxy set METRICS_TOKEN, since every request then comes from the proxy's address
+    'ENABLED': os.environ.get('METRICS_ENABLED') == '1',
+    'DIR': os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'aptitude-metrics')),
+    'FLUSH_INTERVAL': 1.0,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
 MEDIA_URL='/media/'
 MEDIA_ROOT=BASE_DIR / 'media'
 
@@ -18,7 +18,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import  TokenRefreshView
-from aptitude.views import MyTokenObtainPairView, login_view, signup_view, home_view, logout_view, subtopics_view, video_lesson_view, practice_view, practice_new_view, boss_dashboard, subtopic_phase_view, question_phase_view, analytics_view, contests_view
+from aptitude.views import MyTokenObtainPairView, login_view, signup_view, home_view, logout_view, subtopics_view, video_lesson_view, note_content_view, practice_view, practice_new_view, practice_adaptive_view, boss_dashboard, topic_reorder_view, subtopic_phase_view, subtopic_reorder_view, question_phase_view, question_page_view, question_bulk_edit_view, question_import_view, export_view, metrics_view, analytics_view, contests_view
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -38,11 +38,20 @@ urlpatterns = [
     path('contests/', contests_view, name='contests'),
     path("topics/<int:topic_id>/", subtopics_view, name="subtopics"),
     path("subtopics/<int:subtopic_id>/", video_lesson_view, name="video_lesson"),
+    path("notes/<int:note_id>/", note_content_view, name="note_content"),
     path("practice/<int:subtopic_id>/<str:difficulty>/<int:q_index>/", practice_view, name="practice"),
     path("practice-new/<int:subtopic_id>/<str:difficulty>/<int:q_index>/", practice_new_view, name="practice_new"),
+    path("practice-adaptive/<int:subtopic_id>/", practice_adaptive_view, name="practice_adaptive"),
     path("boss/dashboard/", boss_dashboard, name="boss_dashboard"),
+    path("boss/topics/reorder/", topic_reorder_view, name="topic_reorder"),
     path("boss/subtopics/<int:topic_id>/", subtopic_phase_view, name="subtopic_phase"),
+    path("boss/subtopics/<int:topic_id>/reorder/", subtopic_reorder_view, name="subtopic_reorder"),
     path("boss/questions/<int:subtopic_id>/", question_phase_view, name="question_phase"),
+    path("boss/questions/<int:subtopic_id>/page/", question_page_view, name="question_page"),
+    path("boss/questions/<int:subtopic_id>/bulk-edit/", question_bulk_edit_view, name="question_bulk_edit"),
+    path("boss/import/", question_import_view, name="question_import"),
+    path("boss/export/<str:dataset>/", export_view, name="export"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file